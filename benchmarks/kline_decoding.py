@@ -0,0 +1,73 @@
+"""Compare the columnar kline decoder with the previous DataFrame parsing
+
+Usage, from the repository root: PYTHONPATH=. python benchmarks/kline_decoding.py [n_candles]
+"""
+import json
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from binance_trading_bot import helpers, utilities
+
+
+def synthetic_klines(n):
+    rng = np.random.RandomState(0)
+    openTime = 1500000000000+60000*np.arange(n)
+    prices = rng.uniform(1, 2, size=(n, 4))
+    volumes = rng.uniform(0, 100, size=(n, 4))
+    return [[int(openTime[i]), '%.8f' % prices[i, 0], '%.8f' % prices[i, 1],
+             '%.8f' % prices[i, 2], '%.8f' % prices[i, 3], '%.8f' % volumes[i, 0],
+             int(openTime[i])+59999, '%.8f' % volumes[i, 1], int(rng.randint(1, 1000)),
+             '%.8f' % volumes[i, 2], '%.8f' % volumes[i, 3], '0']
+            for i in range(n)]
+
+
+def legacy_candles(klines):
+    klines = pd.DataFrame(klines)
+    candles = pd.DataFrame()
+    candles['open_time'] = klines[0]
+    candles['close_time'] = klines[6]
+    candles['n_trades'] = klines[8]
+    candles['open'] = pd.to_numeric(klines[1])
+    candles['high'] = pd.to_numeric(klines[2])
+    candles['low'] = pd.to_numeric(klines[3])
+    candles['close'] = pd.to_numeric(klines[4])
+    candles['assetVolume'] = pd.to_numeric(klines[5])
+    candles['buyAssetVolume'] = pd.to_numeric(klines[9])
+    candles['sellAssetVolume'] = candles['assetVolume']-candles['buyAssetVolume']
+    candles['quoteVolume'] = pd.to_numeric(klines[7])
+    candles['buyQuoteVolume'] = pd.to_numeric(klines[10])
+    candles['sellQuoteVolume'] = candles['quoteVolume']-candles['buyQuoteVolume']
+    candles['spread'] = candles['high']-candles['low']
+    return candles
+
+
+def best_of(function, repeat=5):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv)>1 else 100000
+    klines = synthetic_klines(n)
+    body = json.dumps(klines).encode('utf-8')
+
+    pd.testing.assert_frame_equal(legacy_candles(klines), 
+                                  utilities.candles_from_klines(klines).to_frame(), 
+                                  check_dtype=False)
+
+    legacy = best_of(lambda: legacy_candles(klines))
+    columnar = best_of(lambda: utilities.candles_from_klines(klines))
+    print('%d candles' % n)
+    print('DataFrame + to_numeric: %8.2f ms' % (legacy*1e3))
+    print('columnar decoder:       %8.2f ms (%.1fx)' % (columnar*1e3, legacy/columnar))
+
+    stdlib = best_of(lambda: json.loads(body))
+    backend = best_of(lambda: helpers.json_loads(body))
+    print('json.loads:             %8.2f ms' % (stdlib*1e3))
+    print('%-23s %8.2f ms (%.1fx)' % (helpers.json.__name__+'.loads:', backend*1e3, stdlib/backend))
+
+
+if __name__ == '__main__':
+    main()
@@ -37,8 +37,8 @@ def asset_analysis(client, asset):
             result = pd.DataFrame(columns=['Duration', ': Buy ', ' Sell '])
             for i in [2, 1, 0]:
                 result.loc[2-i] = [str(5*(i+2**i))+' mins', 
-                          "{0:,.2f}".format(candles['buyQuoteVolume'].iloc[-max(3*i, 1):].sum()),
-                          "{0:,.2f}".format(candles['sellQuoteVolume'].iloc[-max(3*i, 1):].sum())]
+                          "{0:,.2f}".format(candles['buyQuoteVolume'][-max(3*i, 1):].sum()),
+                          "{0:,.2f}".format(candles['sellQuoteVolume'][-max(3*i, 1):].sum())]
             msg = msg+'#'+market+' '\
             "{0:,.2f}".format(float(marketList.at[index, 'volume']))+' ('+\
              "{0:,.2f}".format(float(marketList.at[index, 'volume']/sum(marketList['volume'])*100))+'%)'+\
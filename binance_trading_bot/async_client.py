@@ -0,0 +1,359 @@
+# coding=utf-8
+
+import asyncio
+import time
+
+import aiohttp
+
+from .client import Client
+from .exceptions import BinanceAPIException, BinanceRequestException, BinanceWithdrawException
+from .helpers import date_to_milliseconds, interval_to_milliseconds, json_loads
+from .ratelimiter import request_weight
+
+
+class AsyncClient(Client):
+
+    DEFAULT_MAX_CONCURRENCY = 20
+    KEEPALIVE_TIMEOUT = 60  # seconds
+
+    def __init__(self, api_key, api_secret, requests_params=None,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, **kwargs):
+        """Initialise the AsyncClient
+
+        Mirrors the Client method surface with coroutines. All requests share
+        one keep-alive connection pool and at most max_concurrency requests
+        are in flight at once, so scans over many symbols can be written as
+        asyncio.gather() batches. Prefer ``await AsyncClient.create(...)``,
+        which also pings the API, over calling the constructor directly.
+
+        :param api_key: Binance API key
+        :type api_key: str
+        :param api_secret: Binance API secret
+        :type api_secret: str
+        :param requests_params: optional keyword arguments passed to every aiohttp request
+        :type requests_params: dict
+        :param max_concurrency: maximum number of requests in flight
+        :type max_concurrency: int
+
+        """
+        self.API_KEY = api_key
+        self.API_SECRET = api_secret
+        self._max_concurrency = max_concurrency
+        # created by the first request, inside the event loop running it
+        self._semaphore = None
+        self.session = None
+        self._requests_params = requests_params
+        self._init_shared_state(**kwargs)
+
+    @classmethod
+    async def create(cls, api_key, api_secret, requests_params=None,
+                     max_concurrency=DEFAULT_MAX_CONCURRENCY, **kwargs):
+        self = cls(api_key, api_secret, requests_params, max_concurrency, **kwargs)
+        # init DNS and SSL cert
+        await self.ping()
+        return self
+
+    def _init_session(self):
+        connector = aiohttp.TCPConnector(limit=self._max_concurrency,
+                                         keepalive_timeout=self.KEEPALIVE_TIMEOUT)
+        return aiohttp.ClientSession(connector=connector,
+                                     headers={'Accept': 'application/json',
+                                              'User-Agent': 'binance/python',
+                                              'X-MBX-APIKEY': self.API_KEY})
+
+    def _get_session(self):
+        # before Python 3.10 asyncio primitives bind to get_event_loop() when
+        # they are created, which is not the running loop outside of a coroutine
+        if self.session is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+            self.session = self._init_session()
+        return self.session
+
+    async def close_connection(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close_connection()
+
+    async def _request(self, method, uri, signed, force_params=False, **kwargs):
+
+        kwargs = self._get_request_kwargs(method, signed, force_params, **kwargs)
+        kwargs['timeout'] = aiohttp.ClientTimeout(total=kwargs['timeout'])
+        # aiohttp only encodes strings and, unlike requests, does not drop None values
+        for key in ('params', 'data'):
+            if key in kwargs:
+                kwargs[key] = [(k, str(v)) for k, v in kwargs[key] if v is not None]
+
+        ttl = self._get_cache_ttl(method, uri, signed)
+        if ttl:
+            key = self.response_cache.make_key(uri, kwargs.get('params'))
+            return await self.response_cache.get_async(key, ttl,
+                                                       lambda: self._send_request(method, uri, signed, kwargs))
+        return await self._send_request(method, uri, signed, kwargs)
+
+    async def _send_request(self, method, uri, signed, kwargs):
+        rate_limiter = self._get_rate_limiter(uri)
+        weight = request_weight(uri, kwargs.get('params', kwargs.get('data')))
+        retries = 0
+        while True:
+            await rate_limiter.acquire_async(weight)
+            session = self._get_session()
+            async with self._semaphore:
+                async with getattr(session, method)(uri, **kwargs) as response:
+                    status_code = response.status
+                    text = await response.text()
+            if not self._should_retry(rate_limiter, status_code, response.headers, signed, retries):
+                break
+            retries += 1
+        return self._handle_response(response, status_code, text)
+
+    def _handle_response(self, response, status_code, text):
+        if not str(status_code).startswith('2'):
+            raise BinanceAPIException(response, status_code, text)
+        try:
+            return json_loads(text)
+        except ValueError:
+            raise BinanceRequestException('Invalid Response: %s' % text)
+
+    # Exchange Endpoints
+
+    async def _ensure_exchange_info(self):
+        if self.exchange_info.is_stale():
+            self.exchange_info.load(await self._get('exchangeInfo'))
+
+    async def get_exchange_info(self):
+        await self._ensure_exchange_info()
+        return self.exchange_info.get_exchange_info()
+
+    async def get_symbol_info(self, symbol):
+        await self._ensure_exchange_info()
+        return self.exchange_info.get_symbol_info(symbol)
+
+    async def get_symbol_filters(self, symbol):
+        await self._ensure_exchange_info()
+        return self.exchange_info.get_symbol_filters(symbol)
+
+    async def get_symbol_tick_precision(self, symbol):
+        await self._ensure_exchange_info()
+        return self.exchange_info.get_tick_precision(symbol)
+
+    async def is_valid_symbol(self, symbol):
+        await self._ensure_exchange_info()
+        return self.exchange_info.is_valid_symbol(symbol)
+
+    async def get_symbols_by_base_asset(self, asset):
+        await self._ensure_exchange_info()
+        return self.exchange_info.get_symbols_by_base_asset(asset)
+
+    async def get_symbols_by_quote_asset(self, asset):
+        await self._ensure_exchange_info()
+        return self.exchange_info.get_symbols_by_quote_asset(asset)
+
+    async def refresh_exchange_info(self):
+        self.exchange_info.load(await self._get('exchangeInfo'))
+
+    # Market Data Endpoints
+
+    async def aggregate_trade_iter(self, symbol, start_str=None, last_id=None):
+
+        if start_str is not None and last_id is not None:
+            raise ValueError(
+                'start_time and last_id may not be simultaneously specified.')
+
+        if last_id is None:
+            if start_str is None:
+                trades = await self.get_aggregate_trades(symbol=symbol, fromId=0)
+            else:
+                if type(start_str) == int:
+                    start_ts = start_str
+                else:
+                    start_ts = date_to_milliseconds(start_str)
+                while True:
+                    end_ts = start_ts + (60 * 60 * 1000)
+                    trades = await self.get_aggregate_trades(
+                        symbol=symbol,
+                        startTime=start_ts,
+                        endTime=end_ts)
+                    if len(trades) > 0:
+                        break
+                    if end_ts > int(time.time() * 1000):
+                        return
+                    start_ts = end_ts
+            for t in trades:
+                yield t
+            last_id = trades[-1][self.AGG_ID]
+
+        while True:
+            trades = await self.get_aggregate_trades(symbol=symbol, fromId=last_id)
+            # fromId=n returns a set starting with id n, but we already have that one
+            trades = trades[1:]
+            if len(trades) == 0:
+                return
+            for t in trades:
+                yield t
+            last_id = trades[-1][self.AGG_ID]
+
+    async def _get_earliest_valid_timestamp(self, symbol, interval):
+        kline = await self.get_klines(
+            symbol=symbol,
+            interval=interval,
+            limit=1,
+            startTime=0,
+            endTime=None
+        )
+        return kline[0][0]
+
+    async def get_historical_klines(self, symbol, interval, start_str, end_str=None,
+                                    limit=500, max_workers=None):
+
+        if max_workers and interval_to_milliseconds(interval):
+            return await self.get_historical_klines_concurrent(symbol, interval, start_str, end_str,
+                                                               max_workers=max_workers)
+
+        output_data = []
+        async for kline in self.get_historical_klines_generator(symbol, interval, start_str,
+                                                                end_str, limit):
+            output_data.append(kline)
+        return output_data
+
+    async def get_historical_klines_concurrent(self, symbol, interval, start_str, end_str=None,
+                                               max_workers=None):
+        """Coroutine version of Client.get_historical_klines_concurrent
+
+        All windows are gathered at once, the number of requests in flight is
+        bounded by the client's max_concurrency.
+
+        """
+        limit = self.MAX_KLINES_LIMIT
+        timeframe = interval_to_milliseconds(interval)
+        max_workers = max_workers or self._max_concurrency
+
+        if type(start_str) == int:
+            start_ts = start_str
+        else:
+            start_ts = date_to_milliseconds(start_str)
+
+        if end_str:
+            if type(end_str) == int:
+                end_ts = end_str
+            else:
+                end_ts = date_to_milliseconds(end_str)
+        else:
+            end_ts = int(time.time() * 1000)
+
+        window = limit * timeframe
+        n_windows = max(0, (end_ts - start_ts) // window + 1)
+
+        if n_windows > max_workers:
+            start_ts = max(start_ts, await self._get_earliest_valid_timestamp(symbol, interval))
+            n_windows = max(0, (end_ts - start_ts) // window + 1)
+
+        pages = await asyncio.gather(*[
+            self.get_klines(symbol=symbol,
+                            interval=interval,
+                            limit=limit,
+                            startTime=start_ts + i * window,
+                            endTime=min(start_ts + (i + 1) * window - 1, end_ts))
+            for i in range(n_windows)])
+
+        output_data = []
+        last_open_time = None
+        for page in pages:
+            for kline in page:
+                if last_open_time is None or kline[0] > last_open_time:
+                    output_data.append(kline)
+                    last_open_time = kline[0]
+
+        return output_data
+
+    async def get_historical_klines_generator(self, symbol, interval, start_str, end_str=None,
+                                              limit=500):
+
+        timeframe = interval_to_milliseconds(interval)
+
+        if type(start_str) == int:
+            start_ts = start_str
+        else:
+            start_ts = date_to_milliseconds(start_str)
+
+        first_valid_ts = await self._get_earliest_valid_timestamp(symbol, interval)
+        start_ts = max(start_ts, first_valid_ts)
+
+        end_ts = None
+        if end_str:
+            if type(end_str) == int:
+                end_ts = end_str
+            else:
+                end_ts = date_to_milliseconds(end_str)
+
+        while True:
+            output_data = await self.get_klines(
+                symbol=symbol,
+                interval=interval,
+                limit=limit,
+                startTime=start_ts,
+                endTime=end_ts
+            )
+
+            if not len(output_data):
+                break
+
+            for o in output_data:
+                yield o
+
+            start_ts = output_data[-1][0]
+
+            if len(output_data) < limit:
+                break
+
+            start_ts += timeframe
+
+    # Account Endpoints
+
+    async def get_asset_balance(self, asset, **params):
+        res = await self.get_account(**params)
+        if "balances" in res:
+            for bal in res['balances']:
+                if bal['asset'].lower() == asset.lower():
+                    return bal
+        return None
+
+    async def _request_withdraw_api_checked(self, method, path, **params):
+        res = await self._request_withdraw_api(method, path, True, data=params)
+        if not res['success']:
+            raise BinanceWithdrawException(res['msg'])
+        return res
+
+    async def get_account_status(self, **params):
+        return await self._request_withdraw_api_checked('get', 'accountStatus.html', **params)
+
+    async def get_dust_log(self, **params):
+        return await self._request_withdraw_api_checked('get', 'userAssetDribbletLog.html', **params)
+
+    async def get_trade_fee(self, **params):
+        return await self._request_withdraw_api_checked('get', 'tradeFee.html', **params)
+
+    async def get_asset_details(self, **params):
+        return await self._request_withdraw_api_checked('get', 'assetDetail.html', **params)
+
+    # Withdraw Endpoints
+
+    async def withdraw(self, **params):
+        if 'asset' in params and 'name' not in params:
+            params['name'] = params['asset']
+        return await self._request_withdraw_api_checked('post', 'withdraw.html', **params)
+
+    # User Stream Endpoints
+
+    async def stream_get_listen_key(self):
+        res = await self._post('userDataStream', False, data={})
+        return res['listenKey']
+
+    async def margin_stream_get_listen_key(self):
+        res = await self._request_margin_api('post', 'userDataStream', signed=True)
+        return res['listenKey']
@@ -0,0 +1,251 @@
+from binance_trading_bot import utilities
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+class CandleMatrix(object):
+
+    LOAD_WORKERS = 8
+
+    # columns aligned into (symbols, times) matrices
+    COLUMNS = ['open', 'high', 'low', 'close',
+               'quoteVolume', 'buyQuoteVolume', 'sellQuoteVolume']
+
+    def __init__(self, symbols, openTime, columns, valid):
+        """Candles of many symbols aligned on one time axis
+
+        Every column is a (symbols, times) matrix, candles a symbol does not
+        have, i.e. before its listing, are NaN and False in valid. Indicators
+        are computed for all symbols at once along the time axis.
+
+        """
+        self.symbols = list(symbols)
+        self.openTime = openTime
+        self.columns = columns
+        self.valid = valid
+
+    @classmethod
+    def from_candles(cls, candlesBySymbol, columns=None):
+        symbols = [s for s, candles in candlesBySymbol.items() if candles is not None and len(candles)]
+        if symbols:
+            openTime = np.unique(np.concatenate([candlesBySymbol[s]['open_time'] for s in symbols]))
+        else:
+            openTime = np.empty(0, dtype=np.int64)
+        shape = (len(symbols), len(openTime))
+        names = cls.COLUMNS if columns is None else columns
+        columns = {k: np.full(shape, np.nan) for k in names}
+        valid = np.zeros(shape, dtype=bool)
+        for i, symbol in enumerate(symbols):
+            candles = candlesBySymbol[symbol]
+            position = np.searchsorted(openTime, candles['open_time'])
+            valid[i, position] = True
+            for k in names:
+                columns[k][i, position] = candles[k]
+        return cls(symbols, openTime, columns, valid)
+
+    @classmethod
+    def load(cls, client, symbols, timeFrame, timeDuration, max_workers=LOAD_WORKERS, columns=None):
+        """Fetch the candles of symbols concurrently, symbols failing to load are left out
+
+        :param columns: optional subset of COLUMNS to keep
+
+        """
+        def get_candles(symbol):
+            try:
+                return utilities.get_candles(client, symbol, timeFrame, timeDuration)
+            except Exception:
+                return None
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            candles = list(executor.map(get_candles, symbols))
+        return cls.from_candles(dict(zip(symbols, candles)), columns)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __getitem__(self, key):
+        return self.columns[key]
+
+    @property
+    def shape(self):
+        return self.valid.shape
+
+    def to_frame(self, values):
+        return pd.DataFrame(values, index=self.symbols, columns=self.openTime)
+
+    def last(self, values):
+        # last valid value of every symbol
+        lastValid = self.shape[1]-1-np.argmax(self.valid[:, ::-1], axis=1)
+        last = values[np.arange(len(self)), lastValid]
+        return np.where(self.valid.any(axis=1), last, np.nan)
+
+    def _rolling(self, values, n):
+        # window sums over the last n candles of each symbol, NaN until n valid candles are in
+        cumulative = np.zeros((len(self), self.shape[1]+1))
+        np.cumsum(np.where(self.valid, values, 0.), axis=1, out=cumulative[:, 1:])
+        count = np.zeros((len(self), self.shape[1]+1), dtype=int)
+        np.cumsum(self.valid, axis=1, out=count[:, 1:])
+        total = np.full(self.shape, np.nan)
+        if n<=self.shape[1]:
+            inWindow = count[:, n:]-count[:, :-n]
+            total[:, n-1:] = np.where((inWindow==n)&self.valid[:, n-1:],
+                                      cumulative[:, n:]-cumulative[:, :-n], np.nan)
+        return total
+
+    def _shift(self, values):
+        # remove each symbol's mean to keep the sums of squares well conditioned
+        with np.errstate(invalid='ignore'):
+            mean = np.nanmean(np.where(self.valid, values, np.nan), axis=1)
+        return np.nan_to_num(mean)[:, None]
+
+    def sma(self, n, column='close'):
+        values = self.columns[column]
+        shift = self._shift(values)
+        return shift+self._rolling(values-shift, n)/n
+
+    def bbands(self, n=20, k=2, column='close'):
+        values = self.columns[column]
+        shift = self._shift(values)
+        total = self._rolling(values-shift, n)
+        totalSquares = self._rolling((values-shift)**2, n)
+        middle = shift+total/n
+        std = np.sqrt(np.maximum(totalSquares-total*total/n, 0.)/(n-1))
+        return {'middle_band': middle,
+                'upper_band': middle+k*std,
+                'lower_band': middle-k*std,
+                'std': std}
+
+    def rsi(self, n, column='close'):
+        close = self.columns[column]
+        valid = self.valid
+        alpha = 1./n
+        result = np.full(self.shape, np.nan)
+        averageUp = np.zeros(len(self))
+        averageDown = np.zeros(len(self))
+        previous = np.full(len(self), np.nan)
+        count = np.zeros(len(self), dtype=int)
+        for t in range(self.shape[1]):
+            v = valid[:, t]
+            diff = np.where(v & (count>0), close[:, t]-previous, 0.)
+            up = np.where(v, (1-alpha)*averageUp+alpha*np.maximum(diff, 0.), averageUp)
+            down = np.where(v, (1-alpha)*averageDown+alpha*np.maximum(-diff, 0.), averageDown)
+            averageUp, averageDown = up, down
+            with np.errstate(divide='ignore', invalid='ignore'):
+                value = np.where(down==0, 100., 100-(100/(1+up/down)))
+            # the first n+1 values are left out like in indicator.rsi
+            result[:, t] = np.where(v & (count>=n+1), value, np.nan)
+            previous = np.where(v, close[:, t], previous)
+            count += v
+        return result
+
+    def true_range(self):
+        high = self.columns['high']
+        low = self.columns['low']
+        close = self.columns['close']
+        TR = high-low
+        # previous valid close of every candle
+        index = np.where(self.valid, np.arange(self.shape[1]), -1)
+        index = np.maximum.accumulate(index, axis=1)
+        previous = np.full(self.shape, np.nan)
+        previous[:, 1:] = np.take_along_axis(close, np.maximum(index[:, :-1], 0), axis=1)
+        previous[:, 1:][index[:, :-1]<0] = np.nan
+        withPrevious = ~np.isnan(previous)
+        TR[withPrevious] = np.maximum(TR[withPrevious],
+                                      np.maximum(np.abs(high-previous), np.abs(low-previous))[withPrevious])
+        return np.where(self.valid, TR, np.nan)
+
+    def atr(self, n):
+        TR = self.true_range()
+        valid = self.valid
+        result = np.full(self.shape, np.nan)
+        value = np.full(len(self), np.nan)
+        trSum = np.zeros(len(self))
+        count = np.zeros(len(self), dtype=int)
+        for t in range(self.shape[1]):
+            v = valid[:, t]
+            tr = TR[:, t]
+            # seeded with the mean of the first n-1 true ranges like indicator.average_true_range
+            seed = v & (count==n-1)
+            step = v & (count>=n)
+            trSum = np.where(v & (count<n-1), trSum+np.nan_to_num(tr), trSum)
+            value = np.where(seed, trSum/(n-1) if n>1 else np.nan, value)
+            value = np.where(step, (value*(n-1)+np.nan_to_num(tr))/n, value)
+            result[:, t] = np.where(v & (count>=n-1), value, np.nan)
+            count += v
+        return result
+
+    def bottom(self):
+        # lowest candle body middle of every symbol
+        middle = .5*(self.columns['open']+self.columns['close'])
+        with np.errstate(invalid='ignore'):
+            return np.nanmin(np.where(self.valid, middle, np.inf), axis=1)
+
+    def drawdown_from_bottom(self):
+        """Bottom, last price and percentage above the bottom of every symbol"""
+        bottom = self.bottom()
+        bottom[np.isinf(bottom)] = np.nan
+        price = self.last(self.columns['close'])
+        return bottom, price, (price-bottom)/bottom*100
+
+    def bottom_zones(self):
+        """bottom_zones of every symbol"""
+        middle = .5*(self.columns['open']+self.columns['close'])
+        return bottom_zones(self.columns['low'], middle, self.columns['close'], self.valid)
+
+    def volume_totals(self, axis=0):
+        """Quote volumes summed over symbols (axis=0) or over time (axis=1)"""
+        names = [k for k in ('quoteVolume', 'buyQuoteVolume', 'sellQuoteVolume') if k in self.columns]
+        volumes = np.stack([self.columns[k] for k in names])
+        totals = np.where(self.valid[None], volumes, 0.).sum(axis=axis+1)
+        return dict(zip(names, totals))
+
+def run_lengths(mask):
+    """Runs of True along the last axis of a boolean vector or matrix
+
+    :return: number of runs of every row, and the row, first and last
+        index of every run, ordered by row then position
+
+    """
+    mask = np.atleast_2d(mask)
+    padded = np.zeros((mask.shape[0], mask.shape[1]+2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges==1)
+    ends = np.nonzero(edges==-1)[1]-1
+    return np.bincount(rows, minlength=mask.shape[0]), rows, starts, ends
+
+def bottom_zones(low, middle, close, valid=None):
+    """Visits to the bottom of one series or of every row of a matrix
+
+    The bottom is the lowest candle body middle, a visit is a run of
+    consecutive candles whose low reaches it.
+
+    :return: dict of n_bottom, bottom, price, diff (percentage of the last
+        price above the bottom) and spans, the (first, last) candle index
+        of every visit; one value per row for a matrix
+
+    """
+    vector = np.ndim(low)==1
+    low = np.atleast_2d(low)
+    middle = np.atleast_2d(middle)
+    close = np.atleast_2d(close)
+    if valid is None:
+        valid = np.ones(low.shape, dtype=bool)
+    valid = np.atleast_2d(valid)
+    hasCandles = valid.any(axis=1)
+    bottom = np.where(valid, middle, np.inf).min(axis=1)
+    bottom[~hasCandles] = np.nan
+    with np.errstate(invalid='ignore'):
+        count, rows, starts, ends = run_lengths(valid & (low<=bottom[:, None]))
+    price = np.full(len(low), np.nan)
+    if low.shape[1]:
+        lastValid = low.shape[1]-1-np.argmax(valid[:, ::-1], axis=1)
+        price[hasCandles] = close[np.arange(len(close)), lastValid][hasCandles]
+    spans = np.split(np.column_stack([starts, ends]), np.cumsum(count)[:-1])
+    zones = {'n_bottom': count,
+             'bottom': bottom,
+             'price': price,
+             'diff': (price-bottom)/bottom*100,
+             'spans': spans}
+    if vector:
+        return {k: v[0] for k, v in zones.items()}
+    return zones
@@ -0,0 +1,328 @@
+# coding=utf-8
+
+import asyncio
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight(object):
+
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResponseCache(object):
+
+    # seconds a response stays fresh, keyed by the end of the request uri
+    DEFAULT_TTLS = {
+        'exchange/public/product': 30,
+        'ticker/24hr': 5,
+        'ticker/price': 2,
+        'ticker/bookTicker': 1,
+        'ticker/allPrices': 2,
+        'ticker/allBookTickers': 1,
+        'depth': 1,
+    }
+    MAX_ENTRIES = 1024
+
+    def __init__(self, ttls=None):
+        """Initialise the ResponseCache
+
+        Short-TTL cache for public GET responses with single-flight semantics:
+        concurrent identical requests share one call to the exchange, and
+        repeats within the TTL are answered from memory. Cached responses are
+        shared between callers and must not be modified.
+
+        :param ttls: optional mapping of uri suffix to TTL in seconds, defaults to DEFAULT_TTLS
+        :type ttls: dict
+
+        """
+        self._ttls = dict(self.DEFAULT_TTLS if ttls is None else ttls)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._in_flight = {}
+        self._async_in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_ttl(self, uri):
+        for suffix, ttl in self._ttls.items():
+            if uri.endswith('/' + suffix):
+                return ttl
+        return None
+
+    @staticmethod
+    def make_key(uri, params=None):
+        return uri, tuple(params or ())
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return True, entry[1]
+        return False, None
+
+    def _store(self, key, ttl, result):
+        now = time.time()
+        self._entries[key] = (now + ttl, result)
+        if len(self._entries) > self.MAX_ENTRIES:
+            for k in [k for k, entry in self._entries.items() if entry[0] <= now]:
+                del self._entries[k]
+
+    def get(self, key, ttl, call):
+        """Return the cached response for key or call to fetch it
+
+        :param key: request key, see make_key
+        :type key: tuple
+        :param ttl: seconds the response stays fresh
+        :type ttl: float
+        :param call: function sending the request
+        :type call: function
+
+        """
+        with self._lock:
+            found, result = self._lookup(key, time.time())
+            if found:
+                return result
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = call()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                self._store(key, ttl, flight.result)
+            return flight.result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.event.set()
+
+    async def get_async(self, key, ttl, call):
+        """Coroutine version of get, call returns an awaitable"""
+        with self._lock:
+            found, result = self._lookup(key, time.time())
+            if found:
+                return result
+            future = self._async_in_flight.get(key)
+            if future is None:
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = self._async_in_flight[key] = asyncio.ensure_future(call())
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            del self._async_in_flight[key]
+        with self._lock:
+            self._store(key, ttl, result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            requests = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': float(self.hits + self.coalesced) / requests if requests else 0.,
+                'entries': len(self._entries),
+            }
+
+
+def _nbytes(value):
+    # approximate memory held by an indicator result
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class _BytesLRUCache(object):
+
+    def __init__(self, max_bytes):
+        """LRU cache under a memory budget
+
+        Entries are (version, value, size) tuples, the least recently used
+        ones are evicted while the sizes add up to more than max_bytes.
+
+        :param max_bytes: memory budget of the cached values
+        :type max_bytes: int
+
+        """
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key, version=None):
+        # cached value and whether it was found, with the lock held
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], True
+        self.misses += 1
+        return None, False
+
+    def _store(self, key, value, size, version=None):
+        # with the lock held
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[2]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (version, value, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            self.nbytes -= self._entries.popitem(last=False)[1][2]
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def get_stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': float(self.hits) / requests if requests else 0.,
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+            }
+
+
+class IndicatorCache(_BytesLRUCache):
+
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """Initialise the IndicatorCache
+
+        LRU cache of indicator results under a memory budget. Each entry is
+        tagged with the open time of the last closed candle it was computed
+        on, a newer tag replaces it, so results are reused until the next
+        candle closes. Cached results are shared between callers and must
+        not be modified.
+
+        :param max_bytes: memory budget of the cached results
+        :type max_bytes: int
+
+        """
+        super(IndicatorCache, self).__init__(max_bytes)
+
+    def get(self, key, version, call):
+        """Return the cached result for key or call to compute it
+
+        :param key: hashable identifying the indicator, its market, interval and parameters
+        :type key: tuple
+        :param version: open time of the last closed candle
+        :type version: int
+        :param call: function computing the result
+        :type call: function
+
+        """
+        with self._lock:
+            result, found = self._lookup(key, version)
+        if found:
+            return result
+
+        result = call()
+        size = _nbytes(result)
+
+        with self._lock:
+            if key in self._entries and self._entries[key][0] > version:
+                return result
+            self._store(key, result, size, version)
+        return result
+
+
+class ImageCache(_BytesLRUCache):
+
+    DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """Initialise the ImageCache
+
+        LRU cache of rendered chart images under a memory budget. Keys are
+        built from what the image shows, including the open time of its last
+        closed candle, so a new candle gives a new key and outdated images
+        age out of the cache.
+
+        :param max_bytes: memory budget of the cached images
+        :type max_bytes: int
+
+        """
+        super(ImageCache, self).__init__(max_bytes)
+
+    @staticmethod
+    def make_key(market, interval, params, last_candle_time):
+        """Key of a chart
+
+        :param market: symbol of the chart
+        :type market: str
+        :param interval: candle interval of the chart
+        :type interval: str
+        :param params: hashable of the other chart parameters
+        :type params: tuple
+        :param last_candle_time: open time of the last closed candle
+        :type last_candle_time: int
+
+        """
+        return market, interval, params, last_candle_time
+
+    def get(self, key):
+        """Return the cached image bytes for key, or None"""
+        with self._lock:
+            return self._lookup(key)[0]
+
+    def put(self, key, image):
+        """Cache the image bytes for key
+
+        :param image: encoded image
+        :type image: bytes
+
+        """
+        with self._lock:
+            self._store(key, image, len(image))
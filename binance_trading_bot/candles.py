@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+class Candles(object):
+
+    __slots__ = ('_columns', '_derived')
+
+    # columns in the order of the frames returned by to_frame
+    COLUMNS = ['open_time', 'close_time', 'n_trades',
+               'open', 'high', 'low', 'close',
+               'assetVolume', 'buyAssetVolume', 'sellAssetVolume',
+               'quoteVolume', 'buyQuoteVolume', 'sellQuoteVolume', 'spread']
+
+    # columns computed from the stored ones on first access
+    DERIVED = {
+        'sellAssetVolume': lambda c: c['assetVolume']-c['buyAssetVolume'],
+        'sellQuoteVolume': lambda c: c['quoteVolume']-c['buyQuoteVolume'],
+        'spread': lambda c: c['high']-c['low'],
+        'middle': lambda c: .5*(c['open']+c['close']),
+    }
+
+    def __init__(self, columns):
+        self._columns = columns
+        self._derived = {}
+
+    def __len__(self):
+        return len(self._columns['open_time'])
+
+    def __contains__(self, key):
+        return key in self._columns or key in self.DERIVED
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            # views of the same buffers, derived columns computed so far are kept
+            candles = Candles({k: v[key] for k, v in self._columns.items()})
+            candles._derived.update({k: v[key] for k, v in self._derived.items()})
+            return candles
+        try:
+            return self._columns[key]
+        except KeyError:
+            pass
+        try:
+            return self._derived[key]
+        except KeyError:
+            value = self._derived[key] = self.DERIVED[key](self)
+            return value
+
+    @property
+    def columns(self):
+        return list(self._columns)+[k for k in self.DERIVED if k not in self._columns]
+
+    @property
+    def nbytes(self):
+        return sum(v.nbytes for v in self._columns.values()) \
+        + sum(v.nbytes for v in self._derived.values())
+
+    def to_frame(self):
+        return pd.DataFrame({k: self[k] for k in self.COLUMNS}, columns=self.COLUMNS, copy=False)
+
+    @classmethod
+    def from_frame(cls, frame):
+        return cls({k: np.ascontiguousarray(frame[k].values) for k in frame.columns
+                    if k not in cls.DERIVED})
+
+    def __repr__(self):
+        return 'Candles(%d rows)' % len(self)
@@ -4,8 +4,13 @@ import hashlib
 import hmac
 import requests
 import time
+from concurrent.futures import ThreadPoolExecutor
 from operator import itemgetter
-from .helpers import date_to_milliseconds, interval_to_milliseconds
+from requests.adapters import HTTPAdapter
+from .helpers import date_to_milliseconds, interval_to_milliseconds, json_loads
+from .cache import ResponseCache
+from .exchangeinfo import ExchangeInfoCache
+from .ratelimiter import RateLimiter, request_weight
 from .exceptions import BinanceAPIException, BinanceRequestException, BinanceWithdrawException
 
 
@@ -22,6 +27,12 @@ class Client(object):
     MARGIN_API_VERSION = 'v1'
     FUTURES_API_VERSION = 'v1'
 
+    REQUEST_WEIGHT_LIMIT = 1200
+    FUTURES_REQUEST_WEIGHT_LIMIT = 2400
+    MAX_RATE_LIMIT_RETRIES = 3
+    MAX_KLINES_LIMIT = 1000
+    CONNECTION_POOL_SIZE = 20
+
     SYMBOL_TYPE_SPOT = 'SPOT'
 
     ORDER_STATUS_NEW = 'NEW'
@@ -77,17 +88,34 @@ class Client(object):
     AGG_BUYER_MAKES = 'm'
     AGG_BEST_MATCH = 'M'
 
-    def __init__(self, api_key, api_secret, requests_params=None):
+    def __init__(self, api_key, api_secret, requests_params=None,
+                 exchange_info_ttl=ExchangeInfoCache.DEFAULT_TTL, exchange_info_path=None,
+                 response_cache_ttls=None):
         self.API_KEY = api_key
         self.API_SECRET = api_secret
         self.session = self._init_session()
         self._requests_params = requests_params
+        self._init_shared_state(exchange_info_ttl, exchange_info_path, response_cache_ttls)
 
         # init DNS and SSL cert
         self.ping()
 
+    def _init_shared_state(self, exchange_info_ttl=ExchangeInfoCache.DEFAULT_TTL, exchange_info_path=None,
+                           response_cache_ttls=None):
+        self.response_cache = ResponseCache(response_cache_ttls)
+        self.rate_limiter = RateLimiter(self.REQUEST_WEIGHT_LIMIT)
+        self.futures_rate_limiter = RateLimiter(self.FUTURES_REQUEST_WEIGHT_LIMIT)
+        self.exchange_info = ExchangeInfoCache(lambda: self._get('exchangeInfo'),
+                                               ttl=exchange_info_ttl,
+                                               path=exchange_info_path)
+
     def _init_session(self):
         session = requests.session()
+        # keep enough connections alive for concurrent kline windows
+        adapter = HTTPAdapter(pool_connections=self.CONNECTION_POOL_SIZE,
+                              pool_maxsize=self.CONNECTION_POOL_SIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
         session.headers.update({'Accept': 'application/json',
                                 'User-Agent': 'binance/python',
                                 'X-MBX-APIKEY': self.API_KEY})
@@ -129,7 +157,7 @@ class Client(object):
             params.append(('signature', data['signature']))
         return params
 
-    def _request(self, method, uri, signed, force_params=False, **kwargs):
+    def _get_request_kwargs(self, method, signed, force_params=False, **kwargs):
 
         # set default requests timeout
         kwargs['timeout'] = 10
@@ -163,9 +191,61 @@ class Client(object):
             kwargs['params'] = kwargs['data']
             del(kwargs['data'])
 
-        response = getattr(self.session, method)(uri, **kwargs)
+        return kwargs
+
+    def _request(self, method, uri, signed, force_params=False, **kwargs):
+
+        kwargs = self._get_request_kwargs(method, signed, force_params, **kwargs)
+
+        ttl = self._get_cache_ttl(method, uri, signed)
+        if ttl:
+            key = self.response_cache.make_key(uri, kwargs.get('params'))
+            return self.response_cache.get(key, ttl, lambda: self._send_request(method, uri, signed, kwargs))
+        return self._send_request(method, uri, signed, kwargs)
+
+    def _get_cache_ttl(self, method, uri, signed):
+        # only public market data may be shared between callers
+        if method != 'get' or signed:
+            return None
+        return self.response_cache.get_ttl(uri)
+
+    def _send_request(self, method, uri, signed, kwargs):
+        rate_limiter = self._get_rate_limiter(uri)
+        weight = request_weight(uri, kwargs.get('params', kwargs.get('data')))
+        retries = 0
+        while True:
+            rate_limiter.acquire(weight)
+            response = getattr(self.session, method)(uri, **kwargs)
+            if not self._should_retry(rate_limiter, response.status_code, response.headers, signed, retries):
+                break
+            retries += 1
         return self._handle_response(response)
 
+    def _should_retry(self, rate_limiter, status_code, headers, signed, retries):
+        rate_limiter.update_from_headers(headers)
+        if status_code not in (429, 418):
+            return False
+        # 429 asks us to slow down, 418 means the IP is already banned
+        retry_after = headers.get('Retry-After')
+        retry_after = float(retry_after) if retry_after else 2 ** retries
+        rate_limiter.backoff(retry_after)
+        # signed requests would be rejected once their timestamp is too old
+        return status_code == 429 and not signed and retries < self.MAX_RATE_LIMIT_RETRIES
+
+    def _get_rate_limiter(self, uri):
+        if uri.startswith(self.FUTURES_API_URL):
+            return self.futures_rate_limiter
+        return self.rate_limiter
+
+    def get_cache_stats(self):
+        return self.response_cache.get_stats()
+
+    def get_rate_limit_status(self):
+        return {
+            'spot': self.rate_limiter.get_status(),
+            'futures': self.futures_rate_limiter.get_status(),
+        }
+
     def _request_api(self, method, path, signed=False, version=PUBLIC_API_VERSION, **kwargs):
         uri = self._create_api_uri(path, signed, version)
 
@@ -196,7 +276,7 @@ class Client(object):
         if not str(response.status_code).startswith('2'):
             raise BinanceAPIException(response)
         try:
-            return response.json()
+            return json_loads(response.content)
         except ValueError:
             raise BinanceRequestException('Invalid Response: %s' % response.text)
 
@@ -219,16 +299,28 @@ class Client(object):
         return products
 
     def get_exchange_info(self):
-        return self._get('exchangeInfo')
+        return self.exchange_info.get_exchange_info()
 
     def get_symbol_info(self, symbol):
-        res = self._get('exchangeInfo')
+        return self.exchange_info.get_symbol_info(symbol)
 
-        for item in res['symbols']:
-            if item['symbol'] == symbol.upper():
-                return item
+    def get_symbol_filters(self, symbol):
+        return self.exchange_info.get_symbol_filters(symbol)
 
-        return None
+    def get_symbol_tick_precision(self, symbol):
+        return self.exchange_info.get_tick_precision(symbol)
+
+    def is_valid_symbol(self, symbol):
+        return self.exchange_info.is_valid_symbol(symbol)
+
+    def get_symbols_by_base_asset(self, asset):
+        return self.exchange_info.get_symbols_by_base_asset(asset)
+
+    def get_symbols_by_quote_asset(self, asset):
+        return self.exchange_info.get_symbols_by_quote_asset(asset)
+
+    def refresh_exchange_info(self):
+        self.exchange_info.refresh()
 
     # General Endpoints
 
@@ -329,7 +421,12 @@ class Client(object):
         return kline[0][0]
 
     def get_historical_klines(self, symbol, interval, start_str, end_str=None,
-                              limit=500):
+                              limit=500, max_workers=None):
+
+        # fetch all windows at once when asked to and the interval has a fixed length
+        if max_workers and interval_to_milliseconds(interval):
+            return self.get_historical_klines_concurrent(symbol, interval, start_str, end_str,
+                                                         max_workers=max_workers)
 
         # init our list
         output_data = []
@@ -358,7 +455,6 @@ class Client(object):
             else:
                 end_ts = date_to_milliseconds(end_str)
 
-        idx = 0
         while True:
             # fetch the klines from start_ts up to max 500 entries or the end_ts if set
             temp_data = self.get_klines(
@@ -379,7 +475,6 @@ class Client(object):
             # set our start timestamp using the last value in the array
             start_ts = temp_data[-1][0]
 
-            idx += 1
             # check if we received less than the required limit and exit the loop
             if len(temp_data) < limit:
                 # exit the while loop
@@ -388,9 +483,75 @@ class Client(object):
             # increment next call by our timeframe
             start_ts += timeframe
 
-            # sleep after every 3rd call to be kind to the API
-            if idx % 3 == 0:
-                time.sleep(1)
+        return output_data
+
+    def get_historical_klines_concurrent(self, symbol, interval, start_str, end_str=None,
+                                         max_workers=8):
+        """Get historical klines by fetching every page window in parallel
+
+        The windows are computed up front from the start, end and interval so
+        all requests can be sent at once, each window holding up to
+        MAX_KLINES_LIMIT candles. Requests still go through the shared rate limiter.
+
+        :param symbol: Name of symbol pair e.g BNBBTC
+        :type symbol: str
+        :param interval: Binance Kline interval with a fixed length, i.e. not 1M
+        :type interval: str
+        :param start_str: Start date string in UTC format or timestamp in milliseconds
+        :type start_str: str|int
+        :param end_str: optional - end date string in UTC format or timestamp in milliseconds (default will fetch everything up to now)
+        :type end_str: str|int
+        :param max_workers: number of requests in flight at the same time
+        :type max_workers: int
+
+        :return: list of OHLCV values ordered by open time
+
+        """
+        limit = self.MAX_KLINES_LIMIT
+        timeframe = interval_to_milliseconds(interval)
+
+        if type(start_str) == int:
+            start_ts = start_str
+        else:
+            start_ts = date_to_milliseconds(start_str)
+
+        if end_str:
+            if type(end_str) == int:
+                end_ts = end_str
+            else:
+                end_ts = date_to_milliseconds(end_str)
+        else:
+            end_ts = int(time.time() * 1000)
+
+        window = limit * timeframe
+        n_windows = max(0, (end_ts - start_ts) // window + 1)
+
+        # only worth a round trip when it can save several empty windows
+        if n_windows > max_workers:
+            start_ts = max(start_ts, self._get_earliest_valid_timestamp(symbol, interval))
+            n_windows = max(0, (end_ts - start_ts) // window + 1)
+
+        windows = [(start_ts + i * window, min(start_ts + (i + 1) * window - 1, end_ts))
+                   for i in range(n_windows)]
+
+        def fetch(bounds):
+            return self.get_klines(symbol=symbol,
+                                   interval=interval,
+                                   limit=limit,
+                                   startTime=bounds[0],
+                                   endTime=bounds[1])
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows)))) as executor:
+            pages = list(executor.map(fetch, windows))
+
+        # drop candles repeated on window boundaries
+        output_data = []
+        last_open_time = None
+        for page in pages:
+            for kline in page:
+                if last_open_time is None or kline[0] > last_open_time:
+                    output_data.append(kline)
+                    last_open_time = kline[0]
 
         return output_data
 
@@ -420,7 +581,6 @@ class Client(object):
             else:
                 end_ts = date_to_milliseconds(end_str)
 
-        idx = 0
         while True:
             # fetch the klines from start_ts up to max 500 entries or the end_ts if set
             output_data = self.get_klines(
@@ -442,7 +602,6 @@ class Client(object):
             # set our start timestamp using the last value in the array
             start_ts = output_data[-1][0]
 
-            idx += 1
             # check if we received less than the required limit and exit the loop
             if len(output_data) < limit:
                 # exit the while loop
@@ -451,10 +610,6 @@ class Client(object):
             # increment next call by our timeframe
             start_ts += timeframe
 
-            # sleep after every 3rd call to be kind to the API
-            if idx % 3 == 0:
-                time.sleep(1)
-
     def get_ticker(self, **params):
         return self._get('ticker/24hr', data=params)
 
@@ -0,0 +1,176 @@
+# coding=utf-8
+
+import json
+import os
+import threading
+import time
+
+
+def _decimal_places(value):
+    """Number of significant decimal places of a Binance decimal string
+
+    :param value: decimal string as returned by the API, i.e. "0.00100000"
+    :type value: str
+
+    :return: int number of decimals, i.e. 3
+
+    """
+    return len(value.rstrip('0').partition('.')[2])
+
+
+class ExchangeInfoCache(object):
+
+    DEFAULT_TTL = 60 * 60  # 1 hour
+
+    def __init__(self, fetch, ttl=DEFAULT_TTL, path=None):
+        """Initialise the ExchangeInfoCache
+
+        Keeps the exchangeInfo payload in memory (and optionally on disk) and
+        indexes it by symbol, base asset and quote asset so lookups never
+        need a network round trip while the payload is fresh.
+
+        :param fetch: callable returning a fresh exchangeInfo payload
+        :type fetch: function
+        :param ttl: seconds before the payload is downloaded again
+        :type ttl: int
+        :param path: optional json file used to persist the payload between runs
+        :type path: str
+
+        """
+        self._fetch = fetch
+        self._ttl = ttl
+        self._path = path
+        self._lock = threading.RLock()
+        self._payload = None
+        self._updated_at = 0
+        self._symbols = {}
+        self._base_assets = {}
+        self._quote_assets = {}
+        self._filters = {}
+
+        if self._path:
+            self._load_file()
+
+    def _load_file(self):
+        try:
+            with open(self._path, 'r') as f:
+                cached = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if time.time() - cached.get('updated_at', 0) < self._ttl:
+            self._index(cached['payload'], cached['updated_at'])
+
+    def _save_file(self):
+        try:
+            directory = os.path.dirname(self._path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            tmp_path = self._path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'updated_at': self._updated_at, 'payload': self._payload}, f)
+            os.replace(tmp_path, self._path)
+        except (IOError, OSError):
+            pass
+
+    def _index(self, payload, updated_at):
+        symbols = {}
+        base_assets = {}
+        quote_assets = {}
+        filters = {}
+        for item in payload['symbols']:
+            symbol = item['symbol']
+            symbols[symbol] = item
+            base_assets.setdefault(item['baseAsset'], []).append(symbol)
+            quote_assets.setdefault(item['quoteAsset'], []).append(symbol)
+            filters[symbol] = self._parse_filters(item)
+
+        self._payload = payload
+        self._updated_at = updated_at
+        self._symbols = symbols
+        self._base_assets = base_assets
+        self._quote_assets = quote_assets
+        self._filters = filters
+
+    @staticmethod
+    def _parse_filters(item):
+        parsed = {
+            'baseAssetPrecision': item.get('baseAssetPrecision'),
+            'quotePrecision': item.get('quotePrecision'),
+            'tickSize': None,
+            'tickPrecision': None,
+            'stepSize': None,
+            'stepPrecision': None,
+            'minNotional': None,
+        }
+        for f in item.get('filters', []):
+            if f['filterType'] == 'PRICE_FILTER':
+                parsed['tickSize'] = float(f['tickSize'])
+                parsed['tickPrecision'] = _decimal_places(f['tickSize'])
+            elif f['filterType'] == 'LOT_SIZE':
+                parsed['stepSize'] = float(f['stepSize'])
+                parsed['stepPrecision'] = _decimal_places(f['stepSize'])
+            elif f['filterType'] in ('MIN_NOTIONAL', 'NOTIONAL'):
+                parsed['minNotional'] = float(f['minNotional'])
+        return parsed
+
+    def is_stale(self):
+        return self._payload is None or time.time() - self._updated_at >= self._ttl
+
+    def load(self, payload):
+        """Index an exchangeInfo payload fetched elsewhere
+
+        :param payload: exchangeInfo response
+        :type payload: dict
+
+        """
+        with self._lock:
+            self._index(payload, time.time())
+            if self._path:
+                self._save_file()
+
+    def refresh(self):
+        """Download and index a fresh exchangeInfo payload"""
+        self.load(self._fetch())
+
+    def _ensure(self):
+        if self.is_stale():
+            with self._lock:
+                # another thread may have refreshed while we waited on the lock
+                if self.is_stale():
+                    self.refresh()
+
+    def get_exchange_info(self):
+        self._ensure()
+        return self._payload
+
+    def get_symbol_info(self, symbol):
+        self._ensure()
+        return self._symbols.get(symbol.upper())
+
+    def get_symbol_filters(self, symbol):
+        """Pre-parsed trading rules of a symbol
+
+        :returns: dict with tickSize, tickPrecision, stepSize, stepPrecision,
+            minNotional, baseAssetPrecision and quotePrecision, None if the symbol is unknown
+
+        """
+        self._ensure()
+        return self._filters.get(symbol.upper())
+
+    def get_tick_precision(self, symbol):
+        filters = self.get_symbol_filters(symbol)
+        if filters is None:
+            return None
+        return filters['tickPrecision']
+
+    def is_valid_symbol(self, symbol):
+        self._ensure()
+        return symbol.upper() in self._symbols
+
+    def get_symbols_by_base_asset(self, asset):
+        self._ensure()
+        return list(self._base_assets.get(asset.upper(), []))
+
+    def get_symbols_by_quote_asset(self, asset):
+        self._ensure()
+        return list(self._quote_assets.get(asset.upper(), []))
@@ -5,6 +5,12 @@ import pytz
 
 from datetime import datetime
 
+# orjson parses large kline and ticker payloads several times faster when installed
+try:
+    import orjson as json
+except ImportError:
+    import json
+
 
 def date_to_milliseconds(date_str):
     """Convert UTC date to milliseconds
@@ -50,3 +56,14 @@ def interval_to_milliseconds(interval):
         return int(interval[:-1]) * seconds_per_unit[interval[-1]] * 1000
     except (ValueError, KeyError):
         return None
+
+
+def json_loads(data):
+    """Parse a JSON response body with the fastest available backend
+
+    :param data: response body
+    :type data: bytes or str
+
+    :raises ValueError: if the body is not valid JSON
+    """
+    return json.loads(data)
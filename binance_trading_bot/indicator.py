@@ -1,64 +1,371 @@
 from binance_trading_bot import utilities
+from binance_trading_bot.helpers import interval_to_milliseconds
 import matplotlib.pyplot as plt
 plt.style.use('classic')
 import pandas as pd
 import numpy as np
+import time
+
+# optional IndicatorCache reusing results on closed candles
+indicatorCache = None
+
+def set_indicator_cache(cache):
+    global indicatorCache
+    indicatorCache = cache
+
+def closed_count(candles, now=None):
+    # candles are ordered, only the last one can still be forming
+    if now is None:
+        now = int(time.time()*1000)
+    if len(candles) and candles['close_time'][-1]>=now:
+        return len(candles)-1
+    return len(candles)
+
+def cached(market, timeFrame, name, params, candles, compute):
+    """compute(closedCandles), reused while the window of closed candles is the same
+
+    The still-forming candle is left out, it changes on every trade, see
+    with_forming to add its values.
+
+    """
+    closed = candles[:closed_count(candles)]
+    if indicatorCache is None or not len(closed):
+        return compute(closed)
+    # a window sliding by one candle, or a duration giving another count, is a new key
+    key = (market, timeFrame, name, params, int(closed['open_time'][0]), len(closed))
+    return indicatorCache.get(key, int(closed['open_time'][-1]), lambda: compute(closed))
+
+def with_forming(result, candles, value):
+    """result on the closed candles followed by value(candle) of the forming one
+
+    :param result: Series or DataFrame with one row per closed candle
+    :param value: function of a candle dict, e.g. update_last of a streaming
+        indicator seeded with the closed candles, returning a number or a
+        dict of the columns of result
+
+    """
+    forming = candles[closed_count(candles):]
+    rows = [value(candle) for candle in _rows(forming)]
+    if not rows:
+        return result
+    if isinstance(result, pd.Series):
+        return pd.concat([result, pd.Series(rows, dtype=float)], ignore_index=True)
+    return pd.concat([result, pd.DataFrame(rows, columns=result.columns)], ignore_index=True)
 
 def rsi(candles, n):
-    diff = candles['close'].diff(1)
+    close = pd.Series(candles['close'])
+    diff = close.diff(1)
     up = diff.where(diff > 0, 0.0)
     dn = -diff.where(diff < 0, 0.0)
     emaup = up.ewm(alpha=1/n, min_periods=0, adjust=False).mean()
     emadn = dn.ewm(alpha=1/n, min_periods=0, adjust=False).mean()
     rs = emaup / emadn
-    rsi = pd.Series(np.where(emadn==0, 100, 100-(100/(1+rs))), index=candles['close'].index)
-    try:
-        for i in range(n+1):
-            rsi[i] = None
-    except Exception:
-        pass
+    rsi = pd.Series(np.where(emadn==0, 100, 100-(100/(1+rs))), index=close.index)
+    rsi.iloc[:n+1] = np.nan
     return rsi
 
 def sma(candles):
+    close = pd.Series(candles['close'])
     sma = pd.DataFrame()
-    sma['50'] = candles['close'].rolling(50).mean()
-    sma['100'] = candles['close'].rolling(100).mean()
-    sma['200'] = candles['close'].rolling(200).mean()
+    sma['50'] = close.rolling(50).mean()
+    sma['100'] = close.rolling(100).mean()
+    sma['200'] = close.rolling(200).mean()
     return sma
 
-def volume_profile(client, market, NUM_PRICE_STEP, TIME_FRAME_STEP, TIME_FRAME_DURATION):
+def _spread_cumulative(edges, low, high, volumes):
+    # volumes spread evenly over [low, high] of each candle, cumulated below every edge
+    order = np.argsort(low)
+    density = volumes[:, order]/(high-low)[order]
+    sortedLow = low[order]
+    densityLow = np.hstack([np.zeros((len(volumes), 1)), np.cumsum(density, axis=1)])
+    momentLow = np.hstack([np.zeros((len(volumes), 1)), np.cumsum(density*sortedLow, axis=1)])
+    k = np.searchsorted(sortedLow, edges)
+    cumulative = edges*densityLow[:, k]-momentLow[:, k]
+    order = np.argsort(high)
+    density = volumes[:, order]/(high-low)[order]
+    sortedHigh = high[order]
+    densityHigh = np.hstack([np.zeros((len(volumes), 1)), np.cumsum(density, axis=1)])
+    momentHigh = np.hstack([np.zeros((len(volumes), 1)), np.cumsum(density*sortedHigh, axis=1)])
+    k = np.searchsorted(sortedHigh, edges)
+    return cumulative-(edges*densityHigh[:, k]-momentHigh[:, k])
+
+def _value_area(volume, poc, ratio):
+    # grow from the point of control towards the heavier neighbour until ratio of the volume is covered
+    valueArea = np.zeros(len(volume), dtype=bool)
+    valueArea[poc] = True
+    target = ratio*volume.sum()
+    covered = volume[poc]
+    lo = hi = poc
+    while covered<target and (lo>0 or hi<len(volume)-1):
+        below = volume[lo-1] if lo>0 else -1
+        above = volume[hi+1] if hi<len(volume)-1 else -1
+        if above>=below:
+            hi += 1
+            covered += above
+            valueArea[hi] = True
+        else:
+            lo -= 1
+            covered += below
+            valueArea[lo] = True
+    return valueArea
+
+def _profile_frame(edges, binVolumes, valueAreaRatio):
+    volume = binVolumes.sum(axis=0)
+    poc = int(np.argmax(volume))
+    return pd.DataFrame({'price_min': edges[:-1],
+                         'price_max': edges[1:],
+                         'price': .5*(edges[:-1]+edges[1:]),
+                         'buy_volume': binVolumes[0],
+                         'sell_volume': binVolumes[1],
+                         'volume': volume,
+                         'poc': np.arange(len(volume))==poc,
+                         'value_area': _value_area(volume, poc, valueAreaRatio)},
+                        columns=['price_min', 'price_max', 'price', 'buy_volume', 
+                                 'sell_volume', 'volume', 'poc', 'value_area'])
+
+def profile(candles, NUM_PRICE_STEP, mode='close', tickSize=None, valueAreaRatio=.7):
+    """Volume profile of candles in a single pass
+
+    :param NUM_PRICE_STEP: number of price bins
+    :param mode: 'close' puts a candle's volume in the bin of its close,
+        'spread' spreads it evenly over the candle's high-low range
+    :param tickSize: optional tick size the bin edges are aligned to
+    :param valueAreaRatio: share of the volume inside the value area
+
+    :return: DataFrame of price bins with buy, sell and total volume,
+        flags for the point of control and the value area
+
+    """
+    close = np.asarray(candles['close'], dtype=float)
+    if mode=='spread':
+        low = np.asarray(candles['low'], dtype=float)
+        high = np.asarray(candles['high'], dtype=float)
+        priceMin = low.min()
+        priceMax = high.max()
+    elif mode=='close':
+        priceMin = close.min()
+        priceMax = close.max()
+    else:
+        raise ValueError('Unknown volume profile mode %s' % mode)
+    priceStep = (priceMax-priceMin)/NUM_PRICE_STEP
+    if tickSize:
+        priceMin = np.floor(priceMin/tickSize)*tickSize
+        priceStep = max(np.ceil((priceMax-priceMin)/NUM_PRICE_STEP/tickSize), 1)*tickSize
+    edges = priceMin+priceStep*np.arange(NUM_PRICE_STEP+1)
+    volumes = np.vstack([np.asarray(candles['buyQuoteVolume'], dtype=float),
+                         np.asarray(candles['sellQuoteVolume'], dtype=float)])
+    
+    # candles without range fall in the bin of their close
+    point = np.ones(len(close), dtype=bool) if mode=='close' else high<=low
+    if priceStep>0:
+        index = np.clip(((close[point]-priceMin)/priceStep).astype(int), 0, NUM_PRICE_STEP-1)
+    else:
+        index = np.zeros(point.sum(), dtype=int)
+    # float zeros first, bincount of no candles would be int
+    binVolumes = np.zeros((2, NUM_PRICE_STEP))
+    for v, binVolume in zip(volumes, binVolumes):
+        binVolume += np.bincount(index, weights=v[point], minlength=NUM_PRICE_STEP)
+    if not point.all():
+        spread = ~point
+        binVolumes += np.diff(_spread_cumulative(edges, low[spread], high[spread],
+                                                 volumes[:, spread]), axis=1)
+    
+    return _profile_frame(edges, binVolumes, valueAreaRatio)
+
+def volume_profile(client, market, NUM_PRICE_STEP, TIME_FRAME_STEP, TIME_FRAME_DURATION,
+                   mode='close', tickAligned=False, valueAreaRatio=.7):
     candles = utilities.get_candles(client, market,
                                     TIME_FRAME_STEP, TIME_FRAME_DURATION)
-    priceMin = candles['close'].min()
-    priceMax = candles['close'].max()
-    priceStep = (priceMax-priceMin)/NUM_PRICE_STEP
-    volumeProfile = pd.DataFrame(index=np.arange(NUM_PRICE_STEP), 
-                                  columns=['price_min', 'price_max', 
-                                           'price', 
-                                           'buy_volume',
-                                           'sell_volume'])
-    volumeProfile['price_min'] = \
-    [priceMin+(i-1)*priceStep for i in np.arange(1, NUM_PRICE_STEP+1)]
-    volumeProfile['price_max'] = \
-    [priceMin+i*priceStep for i in np.arange(1, NUM_PRICE_STEP+1)]
-    volumeProfile['price'] = \
-    .5*(volumeProfile['price_min']+volumeProfile['price_max'])
-    volumeProfile['buy_volume'] = \
-    [sum(candles\
-         [volumeProfile['price_min'][i]<=candles['close']]\
-         [candles['close']<=volumeProfile['price_max'][i]]['buyQuoteVolume']) \
-    for i in np.arange(NUM_PRICE_STEP)]
-    volumeProfile['sell_volume'] = \
-    [sum(candles\
-         [volumeProfile['price_min'][i]<=candles['close']]\
-         [candles['close']<=volumeProfile['price_max'][i]]['sellQuoteVolume']) \
-    for i in np.arange(NUM_PRICE_STEP)]
-    volumeProfile['volume'] = volumeProfile['buy_volume']+volumeProfile['sell_volume']
-    return volumeProfile
+    tickSize = client.get_symbol_filters(market)['tickSize'] if tickAligned else None
+    return profile(candles, NUM_PRICE_STEP, mode=mode, tickSize=tickSize,
+                   valueAreaRatio=valueAreaRatio)
+
+class VolumeProfileIndex(object):
+
+    DEFAULT_NUM_PRICE_STEP = 200
+    # capacity grows by a bounded factor and a widened price grid gets a
+    # margin, so appending stays amortised without doubling the memory
+    GROWTH = 1.25
+    PRICE_MARGIN = .1
+
+    def __init__(self, candles, priceStep=None, mode='close'):
+        """Cumulative time x price-bin volume histogram
+
+        Row t holds the buy and sell volume of every price bin summed over
+        the first t candles, so the profile of any window of candles is the
+        difference of two rows. The price grid grows when appended candles
+        trade outside of it, trim drops the candles no window needs anymore.
+
+        :param candles: closed candles to start from, ordered by open time
+        :type candles: binance_trading_bot.candles.Candles
+        :param priceStep: width of a price bin, defaults to the initial range
+            split in DEFAULT_NUM_PRICE_STEP bins
+        :type priceStep: float
+        :param mode: 'close' or 'spread', see profile
+        :type mode: str
+
+        """
+        if mode not in ('close', 'spread'):
+            raise ValueError('Unknown volume profile mode %s' % mode)
+        self.mode = mode
+        low = np.asarray(candles['low' if mode=='spread' else 'close'], dtype=float)
+        high = np.asarray(candles['high' if mode=='spread' else 'close'], dtype=float)
+        if not priceStep:
+            priceStep = (high.max()-low.min())/self.DEFAULT_NUM_PRICE_STEP or 1.
+        self.priceStep = priceStep
+        self.priceMin = np.floor(low.min()/priceStep)*priceStep
+        self.openTime = np.empty(0, dtype=np.int64)
+        self.cumulative = np.zeros((1, 2, 1))
+        self.count = 0
+        self.append(candles)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def edges(self):
+        return self.priceMin+self.priceStep*np.arange(self.cumulative.shape[2]+1)
+
+    def _resize(self, capacity, start=0, below=0, above=0):
+        # copies rows start to count in arrays of capacity rows and below+above more bins
+        count = self.count-start
+        bins = self.cumulative.shape[2]
+        openTime = np.empty(capacity, dtype=np.int64)
+        openTime[:count] = self.openTime[start:self.count]
+        cumulative = np.zeros((capacity+1, 2, bins+below+above))
+        cumulative[:count+1, :, below:below+bins] = self.cumulative[start:self.count+1]
+        self.openTime = openTime
+        self.cumulative = cumulative
+        self.count = count
+        self.priceMin -= below*self.priceStep
+
+    def _grow(self, rows, bins):
+        capacity = len(self.openTime)
+        if self.count+rows>capacity:
+            capacity = max(int(self.GROWTH*capacity), self.count+rows)
+        margin = int(np.ceil(self.PRICE_MARGIN*self.cumulative.shape[2]))
+        below = max(0, -bins[0])
+        above = max(0, bins[1]-self.cumulative.shape[2]+1)
+        if capacity>len(self.openTime) or below or above:
+            self._resize(capacity, below=below+margin if below else 0,
+                         above=above+margin if above else 0)
+
+    def trim(self, startTime):
+        """Drop the candles opened before startTime
+
+        Profiles of windows starting at or after startTime are unchanged,
+        pass the start of the longest window still queried.
+
+        :param startTime: timestamp in milliseconds
+        :type startTime: int
+
+        :return: number of candles dropped
+
+        """
+        start = int(np.searchsorted(self.openTime[:self.count], startTime, 'left'))
+        if start:
+            self._resize(max(int(self.GROWTH*(self.count-start)), 1), start=start)
+        return start
+
+    def append(self, candles):
+        """Add the candles opened after the last one in the index
+
+        :param candles: closed candles ordered by open time
+        :type candles: binance_trading_bot.candles.Candles
+
+        """
+        openTime = np.asarray(candles['open_time'], dtype=np.int64)
+        new = slice(np.searchsorted(openTime, self.openTime[self.count-1], 'right')
+                    if self.count else 0, None)
+        openTime = openTime[new]
+        n = len(openTime)
+        if not n:
+            return
+        close = np.asarray(candles['close'], dtype=float)[new]
+        low = np.asarray(candles['low'], dtype=float)[new] if self.mode=='spread' else close
+        high = np.asarray(candles['high'], dtype=float)[new] if self.mode=='spread' else close
+        volumes = np.vstack([np.asarray(candles['buyQuoteVolume'], dtype=float)[new],
+                             np.asarray(candles['sellQuoteVolume'], dtype=float)[new]])
+        lowBin = np.floor((low-self.priceMin)/self.priceStep).astype(int)
+        highBin = np.floor((high-self.priceMin)/self.priceStep).astype(int)
+        self._grow(n, (lowBin.min(), highBin.max()))
+        lowBin = np.floor((low-self.priceMin)/self.priceStep).astype(int)
+        highBin = np.floor((high-self.priceMin)/self.priceStep).astype(int)
+        bins = self.cumulative.shape[2]
+        
+        rows = np.zeros((n, 2, bins))
+        point = high<=low
+        pointBin = np.minimum(lowBin[point], bins-1)
+        rows[np.flatnonzero(point), :, pointBin] = volumes[:, point].T
+        if not point.all():
+            spread = ~point
+            edges = self.edges
+            overlap = np.clip(np.minimum(edges[1:], high[spread, None])
+                              -np.maximum(edges[:-1], low[spread, None]), 0, None)
+            overlap /= (high-low)[spread, None]
+            rows[spread] = volumes[:, spread].T[:, :, None]*overlap[:, None, :]
+        
+        self.openTime[self.count:self.count+n] = openTime
+        self.cumulative[self.count+1:self.count+n+1] = \
+        self.cumulative[self.count]+np.cumsum(rows, axis=0)
+        self.count += n
+
+    def _rows(self, startTime, endTime):
+        openTime = self.openTime[:self.count]
+        start = 0 if startTime is None else np.searchsorted(openTime, startTime, 'left')
+        end = self.count if endTime is None else np.searchsorted(openTime, endTime, 'right')
+        return start, max(start, end)
+
+    def profile(self, startTime=None, endTime=None, valueAreaRatio=.7):
+        """Volume profile of the candles opened between startTime and endTime
+
+        :param startTime: optional start timestamp in milliseconds
+        :type startTime: int
+        :param endTime: optional end timestamp in milliseconds, inclusive
+        :type endTime: int
+
+        :return: DataFrame as returned by profile
+
+        """
+        start, end = self._rows(startTime, endTime)
+        return _profile_frame(self.edges, self.cumulative[end]-self.cumulative[start],
+                              valueAreaRatio)
+
+    def session_volumes(self, timeFrame):
+        """Buy and sell volume of every price bin for every session
+
+        :param timeFrame: session length as a Binance Kline interval, i.e. 1d for daily sessions
+        :type timeFrame: str
+
+        :return: session open times and an array of shape (sessions, 2, bins)
+
+        """
+        step = interval_to_milliseconds(timeFrame)
+        offset = utilities.WEEK_OFFSET if timeFrame[-1]=='w' else 0
+        openTime = self.openTime[:self.count]
+        sessions = np.unique((openTime-offset)//step)*step+offset
+        boundaries = np.r_[np.searchsorted(openTime, sessions, 'left'), self.count]
+        return sessions, np.diff(self.cumulative[boundaries], axis=0)
+
+    def session_profiles(self, timeFrame, valueAreaRatio=.7):
+        """Volume profile of every session
+
+        :return: list of (session open time, DataFrame as returned by profile)
+
+        """
+        sessions, binVolumes = self.session_volumes(timeFrame)
+        edges = self.edges
+        return [(int(session), _profile_frame(edges, volumes, valueAreaRatio))
+                for session, volumes in zip(sessions, binVolumes)]
+
+    @property
+    def nbytes(self):
+        return self.openTime.nbytes+self.cumulative.nbytes
 
 def bbands(candles):
-    std = candles['close'].rolling(window=20).std()
-    middleBB = candles['close'].rolling(20).mean()
+    close = pd.Series(candles['close'])
+    std = close.rolling(window=20).std()
+    middleBB = close.rolling(20).mean()
     upperBB = pd.Series(middleBB + (2 * std))
     lowerBB = pd.Series(middleBB - (2 * std))
     bollingerBands = pd.DataFrame()
@@ -68,37 +375,314 @@ def bbands(candles):
     bollingerBands['std'] = std
     return bollingerBands
 
-def volatility_stop(candles, n, m): 
-    VStop = pd.DataFrame()
-    VStop['H-L'] = abs(candles['high']-candles['low'])
-    VStop['H-PC'] = abs(candles['high']-candles['close'].shift(1))
-    VStop['L-PC'] = abs(candles['low']-candles['close'].shift(1))
-    VStop['TR'] = VStop[['H-L','H-PC','L-PC']].max(axis=1)
-    VStop['ATR'] = np.nan
-    VStop.ix[n-1,'ATR'] = VStop['TR'][:n-1].mean()
-    for i in range(n,len(VStop)):
-        VStop['ATR'][i] = (VStop['ATR'][i-1]*(n-1)+ VStop['TR'][i])/n
-    VStop['support'] = candles['close']-m*VStop['ATR']
-    VStop['resistance'] = candles['close']+m*VStop['ATR']
-    i = VStop.index[0]
-    while i<=VStop.index[-1]:
-        try:
-            if VStop['support'][i-1]>=0:
-                if candles['close'][i]>=VStop['support'][i-1]:
-                    VStop['support'][i] = max(VStop['support'][i-1], VStop['support'][i])
-                else:
-                    VStop['support'][i] = np.nan
-        except Exception:
-            pass
-        try:
-            if VStop['resistance'][i-1]>=0:
-                if candles['close'][i]<=VStop['resistance'][i-1]:
-                    VStop['resistance'][i] = min(VStop['resistance'][i-1], VStop['resistance'][i])
-                else:
-                    VStop['resistance'][i] = np.nan
-        except Exception:
-            pass
-        i = i+1
-    VStop = VStop[['support', 'resistance', 'ATR']]
+def _trail_support(previous, value, close):
+    # the support only rises while the close holds above it, a close below breaks it
+    if previous>=0:
+        if close>=previous:
+            return max(previous, value)
+        return np.nan
+    return value
+
+def _trail_resistance(previous, value, close):
+    if previous>=0:
+        if close<=previous:
+            return min(previous, value)
+        return np.nan
+    return value
+
+def true_range(candles):
+    high = np.asarray(candles['high'], dtype=float)
+    low = np.asarray(candles['low'], dtype=float)
+    close = np.asarray(candles['close'], dtype=float)
+    TR = high-low
+    if len(close)>1:
+        previousClose = close[:-1]
+        TR[1:] = np.maximum(TR[1:], np.maximum(np.abs(high[1:]-previousClose),
+                                               np.abs(low[1:]-previousClose)))
+    return TR
+
+def average_true_range(candles, n, TR=None):
+    if TR is None:
+        TR = true_range(candles)
+    ATR = np.full(len(TR), np.nan)
+    if n>1 and len(TR)>=n:
+        # Wilder's smoothing seeded with the mean of the first n-1 true ranges
+        seed = np.r_[TR[:n-1].mean(), TR[n:]]
+        ATR[n-1:] = pd.Series(seed).ewm(alpha=1./n, adjust=False).mean().values
+    return ATR
+
+def volatility_stop(candles, n, m, ATR=None):
+    close = np.asarray(candles['close'], dtype=float)
+    if ATR is None:
+        ATR = average_true_range(candles, n)
+    support = (close-m*ATR).tolist()
+    resistance = (close+m*ATR).tolist()
+    closeList = close.tolist()
+    for i in range(1, len(closeList)):
+        support[i] = _trail_support(support[i-1], support[i], closeList[i])
+        resistance[i] = _trail_resistance(resistance[i-1], resistance[i], closeList[i])
+    VStop = pd.DataFrame({'support': support, 'resistance': resistance, 'ATR': ATR},
+                         columns=['support', 'resistance', 'ATR'])
     return VStop
 
+class VolatilityStop(object):
+
+    def __init__(self, n, m, candles=None, TR=None, VStop=None):
+        """Incremental volatility stop
+
+        Absorbs one closed candle at a time in O(1) and yields the same
+        values as volatility_stop over the whole history.
+
+        :param n: ATR period
+        :type n: int
+        :param m: ATR multiplier
+        :type m: float
+        :param candles: optional history to start from
+        :type candles: binance_trading_bot.candles.Candles
+        :param TR: optional true_range of candles
+        :param VStop: optional volatility_stop of candles
+
+        """
+        self.n = n
+        self.m = m
+        self.count = 0
+        self.close = np.nan
+        self.trSum = 0.
+        self.ATR = np.nan
+        self.support = np.nan
+        self.resistance = np.nan
+        if candles is not None and len(candles):
+            if VStop is None:
+                VStop = volatility_stop(candles, n, m)
+            if TR is None:
+                TR = true_range(candles)
+            self.count = len(VStop)
+            self.close = float(candles['close'][-1])
+            self.trSum = float(TR[:n-1].sum())
+            self.ATR, self.support, self.resistance = \
+            [float(VStop[k].iat[-1]) for k in ['ATR', 'support', 'resistance']]
+
+    def _next(self, high, low, close):
+        n = self.n
+        TR = high-low
+        if self.count:
+            TR = max(TR, abs(high-self.close), abs(low-self.close))
+        trSum = self.trSum
+        ATR = self.ATR
+        if self.count<n-1:
+            trSum += TR
+        elif self.count==n-1:
+            ATR = trSum/(n-1) if n>1 else np.nan
+        else:
+            ATR = (ATR*(n-1)+TR)/n
+        support = close-self.m*ATR
+        resistance = close+self.m*ATR
+        if self.count:
+            support = _trail_support(self.support, support, close)
+            resistance = _trail_resistance(self.resistance, resistance, close)
+        return trSum, ATR, support, resistance
+
+    def update(self, high, low, close):
+        """Add a closed candle
+
+        :return: (support, resistance, ATR) of the new candle
+
+        """
+        self.trSum, self.ATR, self.support, self.resistance = self._next(high, low, close)
+        self.close = close
+        self.count += 1
+        return self.support, self.resistance, self.ATR
+
+    def update_last(self, high, low, close):
+        """(support, resistance, ATR) of the still-forming candle, the state is unchanged"""
+        _, ATR, support, resistance = self._next(high, low, close)
+        return support, resistance, ATR
+
+# Streaming indicators
+# update() adds a closed candle, update_last() evaluates the still-forming
+# candle without changing the state, so it can be called on every tick.
+# Candles are mappings with the keys of Candles, i.e. a kline stream event
+# decoded to {'high': ..., 'low': ..., 'close': ...}.
+
+class _RollingWindow(object):
+
+    def __init__(self, n):
+        # sums of x-shift, shifting by a recent mean avoids cancellation in the variance
+        self.n = n
+        self.values = np.zeros(n)
+        self.position = 0
+        self.count = 0
+        self.shift = None
+        self.last = None
+        self.same = 0
+        self.sum = 0.
+        self.sumSquares = 0.
+
+    def peek(self, x):
+        if self.shift is None:
+            return 1, 0., 0., 1
+        # a run of equal values has no deviation, as in pandas
+        same = self.same+1 if x==self.last else 1
+        x -= self.shift
+        count = min(self.count+1, self.n)
+        total = self.sum+x
+        totalSquares = self.sumSquares+x*x
+        if self.count==self.n:
+            oldest = self.values[self.position]
+            total -= oldest
+            totalSquares -= oldest*oldest
+        return count, total, totalSquares, same
+
+    def push(self, x):
+        if self.shift is None:
+            self.shift = x
+        self.count, self.sum, self.sumSquares, self.same = self.peek(x)
+        self.last = x
+        self.values[self.position] = x-self.shift
+        self.position = (self.position+1)%self.n
+        # recentre and resum once per lap so rounding errors do not pile up
+        if self.position==0:
+            mean = self.values.mean()
+            self.values -= mean
+            self.shift += mean
+            self.sum = self.values.sum()
+            self.sumSquares = np.dot(self.values, self.values)
+
+    def state(self):
+        return self.count, self.sum, self.sumSquares, self.same
+
+    def mean(self, count, total, *args):
+        return self.shift+total/count if count==self.n else np.nan
+
+    def std(self, count, total, totalSquares, same):
+        if count<self.n or self.n<2:
+            return np.nan
+        if same>=count:
+            return 0.
+        return np.sqrt(max(totalSquares-total*total/count, 0.)/(count-1))
+
+class SMA(object):
+
+    def __init__(self, n, candles=None):
+        """Simple moving average of the close, as the columns of sma"""
+        self.window = _RollingWindow(n)
+        self.value = np.nan
+        for candle in _rows(candles):
+            self.update(candle)
+
+    def update(self, candle):
+        self.window.push(float(candle['close']))
+        self.value = self.window.mean(*self.window.state())
+        return self.value
+
+    def update_last(self, candle):
+        return self.window.mean(*self.window.peek(float(candle['close'])))
+
+class BollingerBands(object):
+
+    def __init__(self, n=20, k=2, candles=None):
+        """Bollinger bands of the close, as returned by bbands
+
+        Values are dicts with the columns of bbands.
+
+        """
+        self.k = k
+        self.window = _RollingWindow(n)
+        self.value = self._bands(1, 0., 0., 1)
+        for candle in _rows(candles):
+            self.update(candle)
+
+    def _bands(self, *state):
+        middle = self.window.mean(*state)
+        std = self.window.std(*state)
+        return {'middle_band': middle,
+                'upper_band': middle+self.k*std,
+                'lower_band': middle-self.k*std,
+                'std': std}
+
+    def update(self, candle):
+        self.window.push(float(candle['close']))
+        self.value = self._bands(*self.window.state())
+        return self.value
+
+    def update_last(self, candle):
+        return self._bands(*self.window.peek(float(candle['close'])))
+
+class RSI(object):
+
+    def __init__(self, n, candles=None):
+        """Relative strength index with Wilder smoothing, as returned by rsi"""
+        self.n = n
+        self.alpha = 1./n
+        self.count = 0
+        self.close = np.nan
+        self.averageUp = 0.
+        self.averageDown = 0.
+        self.value = np.nan
+        for candle in _rows(candles):
+            self.update(candle)
+
+    def _next(self, close):
+        if not self.count:
+            return 0., 0., np.nan
+        diff = close-self.close
+        averageUp = (1-self.alpha)*self.averageUp+self.alpha*max(diff, 0.)
+        averageDown = (1-self.alpha)*self.averageDown+self.alpha*max(-diff, 0.)
+        # the first n+1 values are left out like in rsi
+        if self.count<self.n+1:
+            return averageUp, averageDown, np.nan
+        if averageDown==0:
+            return averageUp, averageDown, 100.
+        return averageUp, averageDown, 100-(100/(1+averageUp/averageDown))
+
+    def update(self, candle):
+        close = float(candle['close'])
+        self.averageUp, self.averageDown, self.value = self._next(close)
+        self.close = close
+        self.count += 1
+        return self.value
+
+    def update_last(self, candle):
+        return self._next(float(candle['close']))[2]
+
+class ATR(object):
+
+    def __init__(self, n, candles=None):
+        """Average true range, as returned by average_true_range"""
+        self.n = n
+        self.count = 0
+        self.close = np.nan
+        self.trSum = 0.
+        self.value = np.nan
+        for candle in _rows(candles):
+            self.update(candle)
+
+    def _next(self, candle):
+        n = self.n
+        high = float(candle['high'])
+        low = float(candle['low'])
+        TR = high-low
+        if self.count:
+            TR = max(TR, abs(high-self.close), abs(low-self.close))
+        if self.count<n-1:
+            return self.trSum+TR, np.nan
+        if self.count==n-1:
+            # seeded with the mean of the first n-1 true ranges
+            return self.trSum, self.trSum/(n-1) if n>1 else np.nan
+        return self.trSum, (self.value*(n-1)+TR)/n
+
+    def update(self, candle):
+        self.trSum, self.value = self._next(candle)
+        self.close = float(candle['close'])
+        self.count += 1
+        return self.value
+
+    def update_last(self, candle):
+        return self._next(candle)[1]
+
+def _rows(candles):
+    if candles is None:
+        return
+    columns = [k for k in ('high', 'low', 'close') if k in candles]
+    for values in zip(*[np.asarray(candles[k]).tolist() for k in columns]):
+        yield dict(zip(columns, values))
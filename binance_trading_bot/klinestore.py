@@ -0,0 +1,180 @@
+# coding=utf-8
+
+import os
+import sqlite3
+import threading
+import time
+
+from .helpers import interval_to_milliseconds
+
+
+class KlineStore(object):
+
+    DEFAULT_PATH = 'data/klines.db'
+    FETCH_WORKERS = 8
+
+    def __init__(self, path=DEFAULT_PATH):
+        """Initialise the KlineStore
+
+        Persists closed candles in SQLite keyed by (symbol, interval,
+        open_time). Requests are answered from disk and only the ranges the
+        store does not cover yet are fetched: the head before the first
+        request, holes between stored candles and the tail since the last
+        closed candle. The still-forming candle is returned but never stored.
+
+        :param path: SQLite database file, ":memory:" keeps the store in memory
+        :type path: str
+
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS klines (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    open_time INTEGER NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    close_time INTEGER,
+                    quote_volume REAL,
+                    n_trades INTEGER,
+                    taker_buy_volume REAL,
+                    taker_buy_quote_volume REAL,
+                    PRIMARY KEY (symbol, interval, open_time)
+                ) WITHOUT ROWID""")
+            # earliest start time already fetched, so listing dates are not fetched again
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS coverage (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    covered_from INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, interval)
+                )""")
+            # holes the exchange has no candles for, i.e. maintenance windows
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS known_gaps (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    start_time INTEGER NOT NULL,
+                    end_time INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, interval, start_time)
+                )""")
+
+    def _select(self, symbol, interval, start_ts, end_ts):
+        with self._lock:
+            return [list(row) for row in self._conn.execute(
+                'SELECT open_time, open, high, low, close, volume, close_time, '
+                'quote_volume, n_trades, taker_buy_volume, taker_buy_quote_volume '
+                'FROM klines WHERE symbol=? AND interval=? AND open_time BETWEEN ? AND ? '
+                'ORDER BY open_time', (symbol, interval, start_ts, end_ts))]
+
+    def _covered_from(self, symbol, interval):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT covered_from FROM coverage WHERE symbol=? AND interval=?',
+                (symbol, interval)).fetchone()
+        return row[0] if row else None
+
+    def _known_gaps(self, symbol, interval):
+        with self._lock:
+            return set(self._conn.execute(
+                'SELECT start_time, end_time FROM known_gaps WHERE symbol=? AND interval=?',
+                (symbol, interval)))
+
+    def _insert(self, symbol, interval, klines, now):
+        # the still-forming candle changes until it closes
+        rows = [(symbol, interval, int(k[0]), float(k[1]), float(k[2]), float(k[3]),
+                 float(k[4]), float(k[5]), int(k[6]), float(k[7]), int(k[8]),
+                 float(k[9]), float(k[10]))
+                for k in klines if k[6] < now]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO klines VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)', rows)
+
+    def _set_covered_from(self, symbol, interval, covered_from):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO coverage VALUES (?,?,?)',
+                (symbol, interval, covered_from))
+
+    def _add_known_gap(self, symbol, interval, start_ts, end_ts):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO known_gaps VALUES (?,?,?,?)',
+                (symbol, interval, start_ts, end_ts))
+
+    def _missing_ranges(self, symbol, interval, stored, start_ts, end_ts, timeframe):
+        ranges = []
+        covered_from = self._covered_from(symbol, interval)
+        if not stored:
+            return [(start_ts, end_ts)]
+        if covered_from is None or start_ts < covered_from:
+            head_end = stored[0][0] - 1
+            if head_end >= start_ts:
+                ranges.append((start_ts, head_end))
+        known_gaps = self._known_gaps(symbol, interval)
+        for previous, current in zip(stored, stored[1:]):
+            if current[0] - previous[0] > timeframe:
+                gap = (previous[0] + timeframe, current[0] - 1)
+                if gap not in known_gaps:
+                    ranges.append(gap)
+        tail_start = stored[-1][0] + timeframe
+        if tail_start <= end_ts:
+            ranges.append((tail_start, end_ts))
+        return ranges
+
+    def get_klines(self, client, symbol, interval, start_ts, end_ts=None):
+        """Get klines from the store, fetching only what it does not hold yet
+
+        :param client: Binance API client
+        :type client: binance_trading_bot.client.Client
+        :param symbol: Name of symbol pair e.g BNBBTC
+        :type symbol: str
+        :param interval: Binance Kline interval
+        :type interval: str
+        :param start_ts: start timestamp in milliseconds
+        :type start_ts: int
+        :param end_ts: optional end timestamp in milliseconds, defaults to now
+        :type end_ts: int
+
+        :return: list of OHLCV values ordered by open time, the first 11 fields of the REST API layout
+
+        """
+        timeframe = interval_to_milliseconds(interval)
+        # calendar intervals such as 1M have no fixed length to detect holes with
+        if timeframe is None:
+            return client.get_historical_klines(symbol, interval, start_ts, end_ts)
+
+        now = int(time.time() * 1000)
+        end_ts = min(end_ts or now, now)
+        stored = self._select(symbol, interval, start_ts, end_ts)
+
+        fetched = []
+        for range_start, range_end in self._missing_ranges(symbol, interval, stored,
+                                                           start_ts, end_ts, timeframe):
+            klines = client.get_historical_klines(symbol, interval, range_start, range_end,
+                                                  max_workers=self.FETCH_WORKERS)
+            if not klines and stored and stored[0][0] < range_start and range_end < stored[-1][0]:
+                self._add_known_gap(symbol, interval, range_start, range_end)
+            fetched += klines
+
+        if fetched:
+            self._insert(symbol, interval, fetched, now)
+        covered_from = self._covered_from(symbol, interval)
+        if covered_from is None or start_ts < covered_from:
+            self._set_covered_from(symbol, interval, start_ts)
+
+        if not fetched:
+            return stored
+        klines = {k[0]: k for k in stored}
+        for k in fetched:
+            klines[k[0]] = k[:11]
+        return [klines[open_time] for open_time in sorted(klines)]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
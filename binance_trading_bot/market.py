@@ -1,4 +1,7 @@
-from binance_trading_bot import utilities, visual
+from binance_trading_bot import utilities, visual, batch
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+import heapq
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.pyplot import rcParams
@@ -6,29 +9,87 @@ plt.style.use('classic')
 rcParams['figure.figsize'] = 5, 15
 from matplotlib.ticker import FormatStrFormatter
 import matplotlib.patches as mpatches
-from itertools import groupby
-from operator import itemgetter
 
-def altcoin_scan(client):
+SCAN_WORKERS = 16
+
+def scan_markets(client, symbols, timeFrame, timeDuration, max_workers=SCAN_WORKERS, timeout=None):
+    """Fetch the candles of symbols concurrently and yield (symbol, candles) as they arrive
+
+    Requests share the client's rate limiter. Candles are None for symbols
+    failing to load. After timeout seconds the symbols still pending are
+    dropped and the scan ends with what arrived.
+
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {executor.submit(utilities.get_candles, client, symbol, timeFrame, timeDuration): symbol
+               for symbol in symbols}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            try:
+                candles = future.result()
+            except Exception:
+                candles = None
+            yield futures[future], candles
+    except TimeoutError:
+        pass
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+class TopN(object):
+
+    def __init__(self, n):
+        # min-heap of the n largest keys, the weakest of them on top
+        self.n = n
+        self.heap = []
+        self.count = 0
+
+    def push(self, key, item):
+        self.count += 1
+        entry = (key, self.count, item)
+        if len(self.heap)<self.n:
+            heapq.heappush(self.heap, entry)
+        elif entry>self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self):
+        return [item for key, count, item in sorted(self.heap, reverse=True)]
+
+def altcoin_scan(client, timeout=None, topN=10, progress=None):
+    """Rank markets by the number of visits to their 30-day bottom
+
+    :param timeout: optional seconds after which the markets scanned so far are ranked
+    :param topN: size of the running ranking passed to progress
+    :param progress: optional function called with (scanned, total, ranking)
+        after each market, ranking lists the best (symbol, n_bottom, diff) so far
+
+    """
     marketList = utilities.get_market_list(client)
     TIME_FRAME = '4h'
     TIME_FRAME_DURATION = '30 days ago UTC'
-    for index in marketList.index:
-        market = marketList.at[index, 'symbol']
-        candles = utilities.get_candles(client, market, TIME_FRAME, TIME_FRAME_DURATION)
-        candles['middle'] = .5*(candles['open']+candles['close'])
-        bottomIndex = candles['middle'].idxmin()
-        bottom = candles.at[bottomIndex, 'middle']
-        bottomCandles = candles[candles['low']<=bottom]
-        bottomIndices =[]
-        for k,g in groupby(enumerate(bottomCandles.index),lambda x:x[0]-x[1]):
-            group = (map(itemgetter(1),g))
-            group = list(map(int,group))
-            bottomIndices.append((group[0],group[-1]))
-        marketList.at[index, 'n_bottom'] = len(bottomIndices)
-        marketList.at[index, 'bottom'] = bottom
-        marketList.at[index, 'price'] = candles.at[candles.index[-1], 'close']
-    marketList['diff'] = (marketList['price']-marketList['bottom'])/marketList['bottom']*100
+    symbols = list(marketList['symbol'])
+    position = {symbol: i for i, symbol in enumerate(symbols)}
+    columns = {'n_bottom': np.zeros(len(symbols), dtype=int),
+               'bottom': np.full(len(symbols), np.nan),
+               'price': np.full(len(symbols), np.nan),
+               'diff': np.full(len(symbols), np.nan)}
+    scanned = np.zeros(len(symbols), dtype=bool)
+    ranking = TopN(topN)
+    for n, (symbol, candles) in enumerate(scan_markets(client, symbols, TIME_FRAME, 
+                                                       TIME_FRAME_DURATION, timeout=timeout), 1):
+        if candles is not None and len(candles):
+            zones = batch.bottom_zones(candles['low'], candles['middle'], candles['close'])
+            i = position[symbol]
+            for k in columns:
+                columns[k][i] = zones[k]
+            scanned[i] = True
+            ranking.push((zones['n_bottom'], -zones['diff']), (symbol, zones['n_bottom'], zones['diff']))
+        if progress is not None:
+            progress(n, len(symbols), ranking.items())
+    scan = pd.DataFrame(dict(columns, symbol=symbols), 
+                        columns=['symbol', 'n_bottom', 'bottom', 'price', 'diff'])[scanned]
+    marketList = pd.merge(marketList, scan, on='symbol')
     marketList = marketList.sort_values('diff', ascending=True)
     marketList = marketList.sort_values('n_bottom', ascending=False)
     
@@ -36,12 +97,7 @@ def altcoin_scan(client):
     marketListBTC = marketList[marketList['symbol'].isin(marketListBTC)]
     marketListBTC = marketListBTC.set_index('symbol')
 
-    for i in marketList.index:
-        try:
-            if marketList['symbol'].at[i][-4:]!='USDT':
-                marketList = marketList.drop(i)
-        except Exception:
-            pass
+    marketList = marketList[marketList['symbol'].str[-4:]=='USDT']
     marketList = marketList.set_index('symbol')
     
     try:
@@ -52,19 +108,15 @@ def altcoin_scan(client):
     
     return marketListBTC, marketList
     
-def market_change(client):
-    marketList = pd.DataFrame(client.get_products()['data'])
-    parentMarketList = list(set(marketList['parentMarket'].tolist()))
+def market_change(client, marketState=None):
+    # a streamed MarketState answers from memory
+    if marketState is not None and len(marketState):
+        breadth = marketState.breadth()
+    else:
+        breadth = utilities.MarketSnapshot(client).breadth('parentMarket')
     msg = '*Positive versus negative pairs*'
-    for parentMarket in parentMarketList:
-        baseAssetList = list(set(marketList[marketList['parentMarket']==parentMarket]['quoteAsset']))
-        positiveCount = 0
-        negativeCount = 0
-        for baseAsset in baseAssetList:
-            marketList_ = utilities.get_market_list(client, baseAsset)
-            positiveCount = positiveCount+len(marketList_[marketList_['change_24h']>=0.])
-            negativeCount = negativeCount+len(marketList_[marketList_['change_24h']<0.])
-        msg = msg+'\n'+parentMarket+': '+str(positiveCount)+' (+) '+str(negativeCount)+' (-)'
+    for parentMarket, advancing, declining in zip(breadth.index, breadth['advancing'], breadth['declining']):
+        msg = msg+'\n'+parentMarket+': '+str(advancing)+' (+) '+str(declining)+' (-)'
     return msg
 
 def market_movement(client, timeInterval):
@@ -72,30 +124,22 @@ def market_movement(client, timeInterval):
     btcOnlyMarketList, usdtOnlyMarketList = utilities.market_classify(client)
     
     marketList = utilities.get_market_list(client, 'BTC')
-    exchangeVolume = pd.DataFrame()
-    totalVolume = pd.DataFrame()
-    buyVolume = pd.DataFrame()
-    sellVolume = pd.DataFrame()
-    for market in btcOnlyMarketList:
-        try:
-            candles = utilities.get_candles(client, market, timeFrame='1d', timeDuration=str(timeInterval)+' days ago UTC')
-            totalVolume[market] = candles['quoteVolume']
-            totalVolume = totalVolume.fillna(0.)
-            buyVolume[market] = candles['buyQuoteVolume']
-            buyVolume = buyVolume.fillna(0.)
-            sellVolume[market] = candles['sellQuoteVolume']
-            sellVolume = sellVolume.fillna(0.)
-        except Exception:
-            pass
-    exchangeVolume['volume'] = totalVolume.iloc[:, :].sum(axis=1)
-    exchangeVolume['buy-volume'] = buyVolume.iloc[:, :].sum(axis=1)
-    exchangeVolume['sell-volume'] = sellVolume.iloc[:, :].sum(axis=1)
+    timeDuration = str(timeInterval)+' days ago UTC'
+    candleMatrix = batch.CandleMatrix.load(client, btcOnlyMarketList, '1d', timeDuration, 
+                                           columns=['quoteVolume', 'buyQuoteVolume', 'sellQuoteVolume'])
+    volumeTotals = candleMatrix.volume_totals()
+    candles = utilities.get_candles(client, market='BTCUSDT', timeFrame='1d', timeDuration=timeDuration)
+    # days are aligned on the Bitcoin candles plotted above the volumes
+    exchangeVolume = pd.DataFrame({'volume': volumeTotals.get('quoteVolume', 0.),
+                                   'buy-volume': volumeTotals.get('buyQuoteVolume', 0.),
+                                   'sell-volume': volumeTotals.get('sellQuoteVolume', 0.)},
+                                  index=candleMatrix.openTime, columns=['volume', 'buy-volume', 'sell-volume'])
+    exchangeVolume = exchangeVolume.reindex(candles['open_time'], fill_value=0.).reset_index(drop=True)
     
     f, axes = plt.subplots(2, 1, gridspec_kw={'height_ratios':[1, 1]})
     f.set_size_inches(20,15)
     
     ax = axes[0]
-    candles = utilities.get_candles(client, market='BTCUSDT', timeFrame='1d', timeDuration=str(timeInterval)+' days ago UTC')
     visual.candlestick2_ohlc(ax, 
                              candles['open'],
                              candles['high'],
@@ -114,24 +158,9 @@ def market_movement(client, timeInterval):
     ax.set_ylabel("Bitcoin Price", fontsize=20)
     
     ax = axes[1] 
-    visual.candlestick2_ohlc(ax,
-                             0*exchangeVolume['volume'],
-                             exchangeVolume['volume'],
-                             0*exchangeVolume['volume'],
-                             exchangeVolume['volume'],
-                             width=0.6, alpha=.35)
-    visual.candlestick2_ohlc(ax,
-                             0*exchangeVolume['buy-volume'],
-                             exchangeVolume['buy-volume'],
-                             0*exchangeVolume['buy-volume'],
-                             exchangeVolume['buy-volume'],
-                             width=0.28, alpha=1, shift=-0.15)
-    visual.candlestick2_ohlc(ax,
-                             exchangeVolume['sell-volume'],
-                             exchangeVolume['sell-volume'],
-                             0*exchangeVolume['sell-volume'],
-                             0*exchangeVolume['sell-volume'],
-                             width=0.28, alpha=1, shift=+0.15)
+    visual.volume_bars(ax, [(exchangeVolume['volume'], 0.6, 'k', .35, 0),
+                            (exchangeVolume['buy-volume'], 0.28, 'k', 1, -0.15),
+                            (exchangeVolume['sell-volume'], 0.28, 'r', 1, +0.15)])
     ax.plot(exchangeVolume['volume'].rolling(window=20).mean(), linewidth=2, color='gray', linestyle='-')
     ax.yaxis.grid(True)
     for tic in ax.xaxis.get_major_ticks():
@@ -0,0 +1,287 @@
+# coding=utf-8
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .utilities import MarketSnapshot
+from .websockets import BinanceSocketManager
+
+
+class MarketState(object):
+
+    DEFAULT_CAPACITY = 4096
+    RESUM_INTERVAL = 600  # messages
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """Initialise the MarketState
+
+        24h statistics of every symbol in preallocated arrays, one row per
+        symbol, with advancing/declining counts and volume totals of every
+        parent market kept up to date as rows change. Only symbols assigned
+        to a group by set_groups are counted, updates of others are ignored.
+
+        :param capacity: number of symbol rows allocated up front, grows when exceeded
+        :type capacity: int
+
+        """
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._groups = {}
+        self._symbol_groups = {}
+        self.symbols = []
+        self.group_names = []
+        self.price = np.full(capacity, np.nan)
+        self.change = np.zeros(capacity)
+        self.volume = np.zeros(capacity)
+        self.group = np.zeros(capacity, dtype=np.int64)
+        self.listed = np.zeros(capacity, dtype=bool)
+        self.advancing = np.zeros(0, dtype=np.int64)
+        self.declining = np.zeros(0, dtype=np.int64)
+        self.group_volume = np.zeros(0)
+        self.group_weighted_change = np.zeros(0)
+        self.update_time = None
+        self._updates = 0
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def set_groups(self, symbol_groups):
+        """Assign symbols to groups, i.e. their parent market
+
+        Replaces the previous assignment, rows of symbols left out stop
+        being counted until they are assigned again.
+
+        :param symbol_groups: dict of symbol to group name
+        :type symbol_groups: dict
+
+        """
+        with self._lock:
+            self._symbol_groups = dict(symbol_groups)
+            for symbol, row in self._rows.items():
+                group = self._symbol_groups.get(symbol)
+                if group is None:
+                    self.price[row] = np.nan
+                    self.change[row] = 0.
+                    self.volume[row] = 0.
+                    self.listed[row] = False
+                else:
+                    self.group[row] = self._group_id(group)
+            self._resum()
+
+    def _group_id(self, name):
+        if name not in self._groups:
+            self._groups[name] = len(self.group_names)
+            self.group_names.append(name)
+            self.advancing = np.r_[self.advancing, 0]
+            self.declining = np.r_[self.declining, 0]
+            self.group_volume = np.r_[self.group_volume, 0.]
+            self.group_weighted_change = np.r_[self.group_weighted_change, 0.]
+        return self._groups[name]
+
+    def _row(self, symbol):
+        row = self._rows.get(symbol)
+        if row is None:
+            row = self._rows[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            if row >= len(self.price):
+                for name in ('price', 'change', 'volume', 'group', 'listed'):
+                    array = getattr(self, name)
+                    grown = np.zeros(2 * len(array), dtype=array.dtype)
+                    grown[:len(array)] = array
+                    setattr(self, name, grown)
+            self.group[row] = self._group_id(self._symbol_groups[symbol])
+            self.price[row] = np.nan
+            self.change[row] = 0.
+            self.volume[row] = 0.
+            self.listed[row] = False
+        return row
+
+    def _resum(self):
+        # exact totals, so rounding errors of the incremental updates do not pile up
+        n = len(self.symbols)
+        groups = self.group[:n]
+        listed = self.listed[:n]
+        advancing = listed & (self.change[:n] >= 0.)
+        size = len(self.group_names)
+        self.advancing = np.bincount(groups[advancing], minlength=size)
+        self.declining = np.bincount(groups[listed & ~advancing], minlength=size)
+        self.group_volume = np.bincount(groups, weights=self.volume[:n], minlength=size)
+        self.group_weighted_change = np.bincount(groups, weights=self.change[:n] * self.volume[:n],
+                                                 minlength=size)
+
+    def update(self, symbols, prices, changes, volumes, update_time=None):
+        """Set the 24h statistics of symbols
+
+        :param symbols: symbol names, those without a group are skipped
+        :type symbols: list
+        :param prices: last prices, NaN if unknown
+        :param changes: 24h price changes in percent
+        :param volumes: 24h quote volumes
+
+        """
+        with self._lock:
+            known = np.array([symbol in self._symbol_groups for symbol in symbols], dtype=bool)
+            rows = np.array([self._row(symbol) for symbol, k in zip(symbols, known) if k], 
+                            dtype=np.int64)
+            prices = np.asarray(prices, dtype=float)[known]
+            changes = np.asarray(changes, dtype=float)[known]
+            volumes = np.asarray(volumes, dtype=float)[known]
+            groups = self.group[rows]
+            size = len(self.group_names)
+
+            # remove the old contribution of the rows, then add the new one
+            listed = self.listed[rows]
+            wasAdvancing = listed & (self.change[rows] >= 0.)
+            self.advancing -= np.bincount(groups[wasAdvancing], minlength=size)
+            self.declining -= np.bincount(groups[listed & ~wasAdvancing], minlength=size)
+            self.group_volume -= np.bincount(groups, weights=self.volume[rows], minlength=size)
+            self.group_weighted_change -= np.bincount(groups, weights=self.change[rows] * self.volume[rows],
+                                                      minlength=size)
+            isAdvancing = changes >= 0.
+            self.advancing += np.bincount(groups[isAdvancing], minlength=size)
+            self.declining += np.bincount(groups[~isAdvancing], minlength=size)
+            self.group_volume += np.bincount(groups, weights=volumes, minlength=size)
+            self.group_weighted_change += np.bincount(groups, weights=changes * volumes, minlength=size)
+
+            self.price[rows] = prices
+            self.change[rows] = changes
+            self.volume[rows] = volumes
+            self.listed[rows] = True
+            self.update_time = update_time or int(time.time() * 1000)
+            self._updates += 1
+            if self._updates % self.RESUM_INTERVAL == 0:
+                self._resum()
+
+    def process_ticker_message(self, msg):
+        """Apply an all market ticker stream message
+
+        :param msg: list of 24hr ticker events
+        :type msg: list
+
+        """
+        if not msg:
+            return
+        self.update([t['s'] for t in msg],
+                    [t['c'] for t in msg],
+                    [t['P'] for t in msg],
+                    [t['q'] for t in msg],
+                    max(t['E'] for t in msg))
+
+    def breadth(self):
+        """Advancing and declining pairs and volume weighted change of every group
+
+        :return: DataFrame as returned by MarketSnapshot.breadth
+
+        """
+        with self._lock:
+            breadth = pd.DataFrame({'advancing': self.advancing,
+                                    'declining': self.declining,
+                                    'volume': self.group_volume,
+                                    'weighted_change': self.group_weighted_change},
+                                   index=pd.Index(self.group_names, name='parentMarket'))
+        breadth = breadth[breadth['advancing'] + breadth['declining'] > 0].sort_index()
+        breadth['pairs'] = breadth['advancing'] + breadth['declining']
+        breadth['breadth'] = breadth['advancing'] / breadth['pairs']
+        breadth['weighted_change'] = breadth['weighted_change'] / breadth['volume']
+        return breadth
+
+    def top_movers(self, n=10, group=None):
+        """Symbols with the largest 24h gains and losses
+
+        :param n: number of symbols on each side
+        :type n: int
+        :param group: optional group name to restrict to
+        :type group: str
+
+        :return: (gainers, losers) lists of (symbol, change) ordered by magnitude
+
+        """
+        with self._lock:
+            count = len(self.symbols)
+            rows = np.flatnonzero(self.listed[:count])
+            if group is not None:
+                rows = rows[self.group[rows] == self._groups.get(group, -1)]
+            changes = self.change[rows]
+            if len(rows) > n:
+                top = np.argpartition(-changes, n)[:n]
+                bottom = np.argpartition(changes, n)[:n]
+            else:
+                top = bottom = np.arange(len(rows))
+            gainers = sorted(((self.symbols[rows[i]], changes[i]) for i in top), key=lambda x: -x[1])
+            losers = sorted(((self.symbols[rows[i]], changes[i]) for i in bottom), key=lambda x: x[1])
+        return gainers, losers
+
+
+class MarketStateManager(object):
+
+    RESEED_INTERVAL = 3600  # seconds
+
+    def __init__(self, client, bm=None):
+        """Initialise the MarketStateManager
+
+        Seeds a MarketState from one products and ticker snapshot, then keeps
+        it current from the all market ticker stream, which sends the symbols
+        that changed every second. The snapshot is taken again every
+        RESEED_INTERVAL, so listed and delisted symbols are picked up.
+
+        :param client: Binance API client
+        :type client: binance.Client
+        :param bm: optional BinanceSocketManager to share
+        :type bm: BinanceSocketManager
+
+        """
+        self._client = client
+        self._bm = bm
+        self._conn_key = None
+        self._market_state = MarketState()
+        self._seed_time = None
+        self._seeding = threading.Lock()
+        self._init_state()
+        self._start_socket()
+
+    def _init_state(self):
+        snapshot = MarketSnapshot(self._client)
+        markets = snapshot.markets
+        self._market_state.set_groups(dict(zip(markets['symbol'], markets['parentMarket'])))
+        self._market_state.update(list(markets['symbol']),
+                                  np.full(len(markets), np.nan),
+                                  markets['change_24h'].values,
+                                  markets['volume_24h'].values)
+        self._seed_time = time.time()
+
+    def _reseed(self):
+        try:
+            self._init_state()
+        except Exception:
+            # keep the current state, the next ticker event tries again
+            pass
+        finally:
+            self._seeding.release()
+
+    def _start_socket(self):
+        if self._bm is None:
+            self._bm = BinanceSocketManager(self._client)
+
+        self._conn_key = self._bm.start_ticker_socket(self._ticker_event)
+        if not self._bm.is_alive():
+            self._bm.start()
+
+    def _ticker_event(self, msg):
+        if isinstance(msg, dict) and msg.get('e') == 'error':
+            # the socket reconnects, the snapshot rows stay until fresh tickers arrive
+            return
+        self._market_state.process_ticker_message(msg)
+        # the snapshot is fetched off the socket thread
+        if time.time() - self._seed_time > self.RESEED_INTERVAL and self._seeding.acquire(False):
+            threading.Thread(target=self._reseed, daemon=True).start()
+
+    def get_market_state(self):
+        return self._market_state
+
+    def close(self, close_socket=False):
+        self._bm.stop_socket(self._conn_key)
+        if close_socket:
+            self._bm.close()
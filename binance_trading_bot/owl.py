@@ -1,192 +1,380 @@
-from binance_trading_bot import utilities, visual, indicator
+from binance_trading_bot import visual, indicator, utilities
+from binance_trading_bot.pipeline import Pipeline
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 plt.style.use('classic')
 from matplotlib.ticker import FormatStrFormatter
 import matplotlib.patches as mpatches
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from io import BytesIO
+import numpy as np
 import math
+import threading
 
-def volume_spread_analysis(client, market, 
-                           NUM_PRICE_STEP, TIME_FRAME_STEP, TIME_FRAME, TIME_FRAME_DURATION):
-    
-    nDigit = abs(int(math.log10(float(client.get_symbol_info(market)['filters'][0]['tickSize']))))
-    candles = utilities.get_candles(client, market, TIME_FRAME, TIME_FRAME_DURATION)
-    
-    VRVP = indicator.volume_profile(client, market, NUM_PRICE_STEP, TIME_FRAME_STEP, TIME_FRAME_DURATION)
-    BBANDS = indicator.bbands(candles)
-    VSTOP = indicator.volatility_stop(candles, 20, 2)
-    RSI = indicator.rsi(candles, 14)
-    SMA = indicator.sma(candles)
-     
-    # Visualization
-    VSTOP_COLOR = 'indigo'
-    SMA_COLOR = 'black'
-    BBANDS_COLOR = 'green'
-    VOLUME_COLOR = 'gray'
-    BUY_COLOR = 'black'
-    SELL_COLOR = 'red'
-    VOLATILITY_COLOR = 'black'
-    RSI_COLOR = 'black'
-    
-    f,axes = plt.subplots(4, 1, gridspec_kw={'height_ratios':[3, 1, 1, 1]})
-    f.set_size_inches(20,20)
-     
-    ax = axes[0]
-    axt = ax.twiny()
-    axt.barh(VRVP['price'],
-             VRVP['buy_volume'],
-             color='gray',
-             edgecolor='w',
-             height=VRVP['price'][1]-VRVP['price'][0],
-             align='center',
-             alpha=0.25)
-    axt.barh(VRVP['price'],
-             VRVP['buy_volume']+VRVP['sell_volume'],
-             color='gray',
-             edgecolor='w',
-             height=VRVP['price'][1]-VRVP['price'][0],
-             align='center',
-             alpha=0.25)
-    axt.set_xticks([])
-    for tic in axt.xaxis.get_major_ticks():
-        tic.tick1On = tic.tick2On = False
-        tic.label1On = tic.label2On = False
-    
-    visual.candlestick2_ohlc(ax, 
-                             candles['open'],
-                             candles['high'],
-                             candles['low'],
-                             candles['close'],
-                             width=0.6, alpha=1)
-    ax.plot(VSTOP['support'], linewidth=2, color=VSTOP_COLOR, linestyle='-')
-    ax.plot(VSTOP['resistance'], linewidth=2, color=VSTOP_COLOR, linestyle='-')
-    ax.plot(BBANDS['middle_band'], linewidth=1, color=BBANDS_COLOR, linestyle='-')
-    ax.plot(BBANDS['upper_band'], linewidth=1, color=BBANDS_COLOR, linestyle='-')
-    ax.plot(BBANDS['lower_band'], linewidth=1, color=BBANDS_COLOR, linestyle='-')
-    ax.plot(SMA, linewidth=1, color=SMA_COLOR, linestyle='--')
-    
-    if market=='BTCUSDT':
-        pivotList = []
-        for i in range(len(VSTOP)):
-            if math.isnan(VSTOP['support'].iat[i]):
-                if not math.isnan(VSTOP['support'].iat[i-1]):
-                    pivotList.append(VSTOP['support'].iat[i-1])
-            if math.isnan(VSTOP['resistance'].iat[i]):
-                if not math.isnan(VSTOP['resistance'].iat[i-1]):
-                    pivotList.append(VSTOP['resistance'].iat[i-1])
-        pivotList = sorted(pivotList)
-        for pivot in pivotList:
-            ax.text(len(candles)+.5, pivot, str(int(pivot)))
-        
-    ax.yaxis.grid(True)
-    for tic in ax.xaxis.get_major_ticks():
-        tic.tick1On = tic.tick2On = False
-        tic.label1On = tic.label2On = False
-    ax.set_xticks([])
-    ax.set_yticks(VRVP['price_min'].append(VRVP['price_max'].tail(1)))
-    ax.set_xlim(-.5, len(candles))
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.'+str(nDigit)+'f'))
-    ax.get_yaxis().set_label_coords(-0.075,0.5) 
-    ax.set_ylabel("Price",fontsize=20)
-    ax.set_title(market+' '+TIME_FRAME.upper(), fontsize=30, y=1.03, loc='left')
+# candle columns drawn by render_chart
+CHART_COLUMNS = ['open', 'high', 'low', 'close', 
+                 'assetVolume', 'buyAssetVolume', 'sellAssetVolume', 'spread']
+
+def chart_data(client, market, 
+               NUM_PRICE_STEP, TIME_FRAME_STEP, TIME_FRAME, TIME_FRAME_DURATION):
     
-    patchList = [mpatches.Patch(color=VOLUME_COLOR, label='market-profile'),
-                 mpatches.Patch(color=VSTOP_COLOR, label='volatility-stop'),
-                 mpatches.Patch(color=BBANDS_COLOR, label='bollinger-bands'),
-                 mpatches.Patch(color=SMA_COLOR, label='moving-average')]
-    ax.legend(handles=patchList, loc='best', prop={'size': 20}, ncol=len(patchList),framealpha=0.5)
+    nDigit = client.get_symbol_tick_precision(market)
+    # indicators of the closed candles are reused while they are the same,
+    # streaming indicators seeded with them give the values of the forming candle
+    def cached(name, params, compute):
+        def node(candles, **inputs):
+            # inputs are results of cached nodes, i.e. of the same closed candles
+            return indicator.cached(market, TIME_FRAME, name, (TIME_FRAME_STEP,)+params, 
+                                    candles, lambda closed: compute(closed, **inputs))
+        return node
     
-    ax = axes[1]
-    visual.candlestick2_ohlc(ax,
-                             0*candles['assetVolume'],
-                             candles['assetVolume'],
-                             0*candles['assetVolume'],
-                             candles['assetVolume'],
-                             width=0.6, alpha=.35)
-    visual.candlestick2_ohlc(ax,
-                             0*candles['buyAssetVolume'],
-                             candles['buyAssetVolume'],
-                             0*candles['buyAssetVolume'],
-                             candles['buyAssetVolume'],
-                             width=0.28, alpha=1, shift=-0.15)
-    visual.candlestick2_ohlc(ax,
-                             candles['sellAssetVolume'],
-                             candles['sellAssetVolume'],
-                             0*candles['sellAssetVolume'],
-                             0*candles['sellAssetVolume'],
-                             width=0.28, alpha=1, shift=+0.15)
-    ax.yaxis.grid(True)
-    for tic in ax.xaxis.get_major_ticks():
-        tic.tick1On = tic.tick2On = False
-        tic.label1On = tic.label2On = False
-    ax.set_xticks([])
-    ax.set_xlim(-.5, len(candles))
-    ax.get_yaxis().set_label_coords(-0.075,0.5)  
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.2f'))
-    ax.get_xaxis().set_label_coords(0.5, -0.025) 
-    ax.set_ylabel("Volume",fontsize=20)
+    def bbands(candles):
+        return indicator.bbands(candles), indicator.BollingerBands(20, 2, candles)
     
-    patchList = [mpatches.Patch(color=VOLUME_COLOR, label='volume'),
-                 mpatches.Patch(color=BUY_COLOR, label='buy-volume'),
-                 mpatches.Patch(color=SELL_COLOR, label='sell-volume')]
-    ax.legend(handles=patchList, loc='best', prop={'size': 20}, ncol=len(patchList), framealpha=0.5)
+    def average_true_range(candles, TR):
+        return indicator.average_true_range(candles, 20, TR=TR)
     
-    ax = axes[2]
-    visual.candlestick2_ohlc(ax,
-                             0*candles['spread'],
-                             candles['spread'],
-                             0*candles['spread'],
-                             candles['spread'],
-                             width=0.6, colorup=VOLATILITY_COLOR, alpha=.35)
-    ax.yaxis.grid(True)
-    for tic in ax.xaxis.get_major_ticks():
-        tic.tick1On = tic.tick2On = False
-        tic.label1On = tic.label2On = False
-    ax.set_xticks([])
-    ax.set_xlim(-.5, len(candles))
-    ax.get_yaxis().set_label_coords(-0.075,0.5) 
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.'+str(nDigit)+'f'))
-    ax.get_xaxis().set_label_coords(0.5, -0.025) 
-    ax.set_ylabel("Volatility",fontsize=20)
+    def volatility_stop(candles, TR, ATR):
+        VSTOP = indicator.volatility_stop(candles, 20, 2, ATR=ATR)
+        return VSTOP, indicator.VolatilityStop(20, 2, candles, TR=TR, VStop=VSTOP)
     
-    patchList = [mpatches.Patch(color=VOLATILITY_COLOR, label='average-true-range'),
-                 mpatches.Patch(color=BBANDS_COLOR, label='standard-deviation')]
-    ax.legend(handles=patchList, loc='best', prop={'size': 20}, ncol=len(patchList), framealpha=0.5)
+    def rsi(candles):
+        return indicator.rsi(candles, 14), indicator.RSI(14, candles)
     
-    axt = ax.twinx()
-    axt.plot(BBANDS['std'], linewidth=2, color=BBANDS_COLOR, linestyle='-')
-    for tic in axt.xaxis.get_major_ticks():
-        tic.tick1On = tic.tick2On = False
-        tic.label1On = tic.label2On = False
-    axt.set_xticks([])
-    axt.set_yticks([])
-    axt.set_xlim(-.5, len(candles))
+    def sma(candles):
+        SMA = indicator.sma(candles)
+        return SMA, {k: indicator.SMA(int(k), candles) for k in SMA.columns}
     
-    axt = ax.twinx()
-    axt.plot(VSTOP['ATR'], linewidth=2, color=VOLATILITY_COLOR, linestyle='-')
-    for tic in axt.xaxis.get_major_ticks():
-        tic.tick1On = tic.tick2On = False
-        tic.label1On = tic.label2On = False
-    axt.set_xticks([])
-    axt.set_xlim(-.5, len(candles))
+    # both candle sets come from a single fetch of the finer candles
+    chart = Pipeline(client)
+    chart.candles('candles', market, TIME_FRAME, TIME_FRAME_DURATION, baseTimeFrame=TIME_FRAME_STEP)
+    chart.candles('stepCandles', market, TIME_FRAME_STEP, TIME_FRAME_DURATION)
+    chart.add('VRVP', indicator.profile, ['stepCandles'], NUM_PRICE_STEP=NUM_PRICE_STEP)
+    chart.add('BBANDS', cached('bbands', (20, 2), bbands), ['candles'])
+    chart.add('TR', cached('true_range', (), indicator.true_range), ['candles'])
+    chart.add('ATR', cached('atr', (20,), average_true_range), 
+              {'candles': 'candles', 'TR': 'TR'})
+    chart.add('VSTOP', cached('volatility_stop', (20, 2), volatility_stop), 
+              {'candles': 'candles', 'TR': 'TR', 'ATR': 'ATR'})
+    chart.add('RSI', cached('rsi', (14,), rsi), ['candles'])
+    chart.add('SMA', cached('sma', (), sma), ['candles'])
+    results = chart.run()
     
-    ax = axes[3]
-    ax.plot(RSI, linewidth=2, color=RSI_COLOR, linestyle='-')
-    ax.axhline(y=50, color=RSI_COLOR, linestyle='--')
-    ax.axhspan(ymin=20, ymax=80, color=RSI_COLOR, alpha=0.1)
-    ax.axhspan(ymin=30, ymax=70, color=RSI_COLOR, alpha=0.1)
-    ax.yaxis.grid(True)
+    candles = results['candles']
+    BBANDS, bb = results['BBANDS']
+    BBANDS = indicator.with_forming(BBANDS, candles, bb.update_last)
+    VSTOP, vs = results['VSTOP']
+    VSTOP = indicator.with_forming(VSTOP, candles, lambda c: 
+                                   dict(zip(['support', 'resistance', 'ATR'],
+                                            vs.update_last(c['high'], c['low'], c['close']))))
+    RSI, rs = results['RSI']
+    RSI = indicator.with_forming(RSI, candles, rs.update_last)
+    SMA, ma = results['SMA']
+    SMA = indicator.with_forming(SMA, candles, lambda c: {k: ma[k].update_last(c) for k in ma})
+    # plain arrays, so the payload pickles cheaply to a render worker
+    return {'market': market,
+            'TIME_FRAME': TIME_FRAME,
+            'nDigit': nDigit,
+            'candles': {k: np.asarray(candles[k]) for k in CHART_COLUMNS},
+            'VRVP': {k: results['VRVP'][k].values for k in ['price_min', 'price_max', 'price', 
+                                                             'buy_volume', 'sell_volume']},
+            'BBANDS': {k: BBANDS[k].values for k in BBANDS.columns},
+            'VSTOP': {k: VSTOP[k].values for k in VSTOP.columns},
+            'RSI': RSI.values,
+            'SMA': SMA.values}
+
+# Visualization
+VSTOP_COLOR = 'indigo'
+SMA_COLOR = 'black'
+BBANDS_COLOR = 'green'
+VOLUME_COLOR = 'gray'
+BUY_COLOR = 'black'
+SELL_COLOR = 'red'
+VOLATILITY_COLOR = 'black'
+RSI_COLOR = 'black'
+
+# (width, color, alpha, shift) of the volume bars, candlestick2_ohlc style of the spread
+VOLUME_STYLE = (0.6, 'k', .35, 0)
+BUY_VOLUME_STYLE = (0.28, BUY_COLOR, 1, -0.15)
+SELL_VOLUME_STYLE = (0.28, SELL_COLOR, 1, +0.15)
+SPREAD_STYLE = {'width': 0.6, 'colorup': VOLATILITY_COLOR, 'alpha': .35}
+
+def _hide_xticks(ax):
     for tic in ax.xaxis.get_major_ticks():
         tic.tick1On = tic.tick2On = False
         tic.label1On = tic.label2On = False
     ax.set_xticks([])
-    ax.set_xlim(-.5, len(candles))
-    ax.get_yaxis().set_label_coords(-0.075,0.5) 
-    ax.yaxis.set_major_formatter(FormatStrFormatter('%.'+str(nDigit)+'f'))
-    ax.get_xaxis().set_label_coords(0.5, -0.025) 
-    ax.set_ylabel("Momentum",fontsize=20)
-    
-    patchList = [mpatches.Patch(color=RSI_COLOR, label='relative-strength')]
-    ax.legend(handles=patchList, loc='best', prop={'size': 20}, ncol=len(patchList), framealpha=0.5)
-      
-    f.tight_layout()
-    plt.savefig('img/'+market+'_'+TIME_FRAME.upper()+'.png', bbox_inches='tight')
\ No newline at end of file
+
+def _finite_range(*arrays):
+    values = np.concatenate([np.ravel(a) for a in arrays])
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return None
+    return values.min(), values.max()
+
+def _autoscale_y(ax, *arrays):
+    # data limits of the new values only, the previous chart's are dropped
+    valueRange = _finite_range(*arrays)
+    if valueRange is not None:
+        ax.ignore_existing_data_limits = True
+        ax.update_datalim([(0, valueRange[0]), (0, valueRange[1])])
+        ax.autoscale_view(scalex=False)
+
+def _profile_verts(price, volume, height):
+    # horizontal bars from 0 to volume, centred on price
+    bottom = price-height/2
+    top = price+height/2
+    zero = np.zeros(len(price))
+    return np.stack([np.column_stack([zero, bottom]),
+                     np.column_stack([zero, top]),
+                     np.column_stack([volume, top]),
+                     np.column_stack([volume, bottom])], axis=1)
+
+class ChartTemplate(object):
+
+    def __init__(self):
+        """Figure of volume_spread_analysis, laid out once
+
+        Axes, twin axes, legends and tick settings are created here, render()
+        only replaces the data of the artists and the axis limits. The figure
+        is not registered with pyplot, close() releases it.
+
+        """
+        self._lock = threading.Lock()
+        f = Figure()
+        FigureCanvasAgg(f)
+        axes = f.subplots(4, 1, gridspec_kw={'height_ratios':[3, 1, 1, 1]})
+        f.set_size_inches(20,20)
+        self.figure = f
+        self.axes = axes
+        
+        ax = axes[0]
+        axt = self.profileAxes = ax.twiny()
+        self.profile = [PolyCollection([], facecolors='gray', edgecolors='w', alpha=0.25)
+                        for _ in range(2)]
+        for collection in self.profile:
+            axt.add_collection(collection)
+        _hide_xticks(axt)
+        
+        self.candles = visual.candlestick2_ohlc(ax, [], [], [], [], width=0.6, alpha=1)
+        self.support, = ax.plot([], [], linewidth=2, color=VSTOP_COLOR, linestyle='-')
+        self.resistance, = ax.plot([], [], linewidth=2, color=VSTOP_COLOR, linestyle='-')
+        self.bands = [ax.plot([], [], linewidth=1, color=BBANDS_COLOR, linestyle='-')[0]
+                      for _ in range(3)]
+        self.sma = [ax.plot([], [], linewidth=1, color=SMA_COLOR, linestyle='--')[0]
+                    for _ in range(3)]
+        self.pivots = []
+        ax.yaxis.grid(True)
+        _hide_xticks(ax)
+        ax.get_yaxis().set_label_coords(-0.075,0.5) 
+        ax.set_ylabel("Price",fontsize=20)
+        self.title = ax.set_title('', fontsize=30, y=1.03, loc='left')
+        patchList = [mpatches.Patch(color=VOLUME_COLOR, label='market-profile'),
+                     mpatches.Patch(color=VSTOP_COLOR, label='volatility-stop'),
+                     mpatches.Patch(color=BBANDS_COLOR, label='bollinger-bands'),
+                     mpatches.Patch(color=SMA_COLOR, label='moving-average')]
+        ax.legend(handles=patchList, loc='best', prop={'size': 20}, ncol=len(patchList),framealpha=0.5)
+        
+        ax = axes[1]
+        self.volume = visual.volume_bars(ax, [])
+        ax.yaxis.grid(True)
+        _hide_xticks(ax)
+        ax.get_yaxis().set_label_coords(-0.075,0.5)  
+        ax.yaxis.set_major_formatter(FormatStrFormatter('%.2f'))
+        ax.get_xaxis().set_label_coords(0.5, -0.025) 
+        ax.set_ylabel("Volume",fontsize=20)
+        patchList = [mpatches.Patch(color=VOLUME_COLOR, label='volume'),
+                     mpatches.Patch(color=BUY_COLOR, label='buy-volume'),
+                     mpatches.Patch(color=SELL_COLOR, label='sell-volume')]
+        ax.legend(handles=patchList, loc='best', prop={'size': 20}, ncol=len(patchList), framealpha=0.5)
+        
+        ax = axes[2]
+        self.spread = visual.candlestick2_ohlc(ax, [], [], [], [], **SPREAD_STYLE)
+        ax.yaxis.grid(True)
+        _hide_xticks(ax)
+        ax.get_yaxis().set_label_coords(-0.075,0.5) 
+        ax.get_xaxis().set_label_coords(0.5, -0.025) 
+        ax.set_ylabel("Volatility",fontsize=20)
+        patchList = [mpatches.Patch(color=VOLATILITY_COLOR, label='average-true-range'),
+                     mpatches.Patch(color=BBANDS_COLOR, label='standard-deviation')]
+        ax.legend(handles=patchList, loc='best', prop={'size': 20}, ncol=len(patchList), framealpha=0.5)
+        
+        axt = self.stdAxes = ax.twinx()
+        self.std, = axt.plot([], [], linewidth=2, color=BBANDS_COLOR, linestyle='-')
+        _hide_xticks(axt)
+        axt.set_yticks([])
+        
+        axt = self.atrAxes = ax.twinx()
+        self.atr, = axt.plot([], [], linewidth=2, color=VOLATILITY_COLOR, linestyle='-')
+        _hide_xticks(axt)
+        
+        ax = axes[3]
+        self.rsi, = ax.plot([], [], linewidth=2, color=RSI_COLOR, linestyle='-')
+        ax.axhline(y=50, color=RSI_COLOR, linestyle='--')
+        ax.axhspan(ymin=20, ymax=80, color=RSI_COLOR, alpha=0.1)
+        ax.axhspan(ymin=30, ymax=70, color=RSI_COLOR, alpha=0.1)
+        ax.yaxis.grid(True)
+        _hide_xticks(ax)
+        ax.get_yaxis().set_label_coords(-0.075,0.5) 
+        ax.get_xaxis().set_label_coords(0.5, -0.025) 
+        ax.set_ylabel("Momentum",fontsize=20)
+        patchList = [mpatches.Patch(color=RSI_COLOR, label='relative-strength')]
+        ax.legend(handles=patchList, loc='best', prop={'size': 20}, ncol=len(patchList), framealpha=0.5)
+        
+        f.tight_layout()
+
+    def render(self, payload):
+        """Draw a chart_data() payload, returns PNG bytes"""
+        with self._lock:
+            self._update(payload)
+            image = BytesIO()
+            self.figure.savefig(image, format='png', bbox_inches='tight')
+            return image.getvalue()
+
+    def _update(self, payload):
+        market = payload['market']
+        nDigit = payload['nDigit']
+        candles = payload['candles']
+        VRVP = payload['VRVP']
+        BBANDS = payload['BBANDS']
+        VSTOP = payload['VSTOP']
+        RSI = payload['RSI']
+        SMA = payload['SMA']
+        nCandles = len(candles['close'])
+        x = np.arange(nCandles)
+        
+        ax = self.axes[0]
+        height = VRVP['price'][1]-VRVP['price'][0]
+        totalVolume = VRVP['buy_volume']+VRVP['sell_volume']
+        self.profile[0].set_verts(_profile_verts(VRVP['price'], VRVP['buy_volume'], height))
+        self.profile[1].set_verts(_profile_verts(VRVP['price'], totalVolume, height))
+        self.profileAxes.set_xlim(0, max(totalVolume.max(), 1e-12))
+        
+        visual.update_candlestick2_ohlc(self.candles,
+                                        candles['open'],
+                                        candles['high'],
+                                        candles['low'],
+                                        candles['close'],
+                                        width=0.6, alpha=1)
+        self.support.set_data(x, VSTOP['support'])
+        self.resistance.set_data(x, VSTOP['resistance'])
+        for line, k in zip(self.bands, ['middle_band', 'upper_band', 'lower_band']):
+            line.set_data(x, BBANDS[k])
+        for line, values in zip(self.sma, np.asarray(SMA).T):
+            line.set_data(x, values)
+        
+        for text in self.pivots:
+            text.remove()
+        self.pivots = []
+        if market=='BTCUSDT':
+            pivotList = []
+            for i in range(nCandles):
+                if math.isnan(VSTOP['support'][i]):
+                    if not math.isnan(VSTOP['support'][i-1]):
+                        pivotList.append(VSTOP['support'][i-1])
+                if math.isnan(VSTOP['resistance'][i]):
+                    if not math.isnan(VSTOP['resistance'][i-1]):
+                        pivotList.append(VSTOP['resistance'][i-1])
+            pivotList = sorted(pivotList)
+            for pivot in pivotList:
+                self.pivots.append(ax.text(nCandles+.5, pivot, str(int(pivot))))
+        
+        yTicks = list(VRVP['price_min'])+[VRVP['price_max'][-1]]
+        ax.set_yticks(yTicks)
+        yMin, yMax = _finite_range(yTicks, candles['low'], candles['high'], 
+                                   VSTOP['support'], VSTOP['resistance'],
+                                   BBANDS['upper_band'], BBANDS['lower_band'], SMA)
+        margin = .02*(yMax-yMin)
+        ax.set_ylim(yMin-margin, yMax+margin)
+        ax.yaxis.set_major_formatter(FormatStrFormatter('%.'+str(nDigit)+'f'))
+        self.title.set_text(market+' '+payload['TIME_FRAME'].upper())
+        
+        ax = self.axes[1]
+        assetVolume = candles['assetVolume']
+        buyAssetVolume = candles['buyAssetVolume']
+        sellAssetVolume = candles['sellAssetVolume']
+        visual.update_volume_bars(self.volume, [(assetVolume,)+VOLUME_STYLE,
+                                                (buyAssetVolume,)+BUY_VOLUME_STYLE,
+                                                (sellAssetVolume,)+SELL_VOLUME_STYLE])
+        _autoscale_y(ax, [0.], assetVolume, buyAssetVolume, sellAssetVolume)
+        
+        ax = self.axes[2]
+        spread = candles['spread']
+        visual.update_candlestick2_ohlc(self.spread, 0*spread, spread, 0*spread, spread, **SPREAD_STYLE)
+        _autoscale_y(ax, [0.], spread)
+        ax.yaxis.set_major_formatter(FormatStrFormatter('%.'+str(nDigit)+'f'))
+        self.std.set_data(x, BBANDS['std'])
+        _autoscale_y(self.stdAxes, BBANDS['std'])
+        self.atr.set_data(x, VSTOP['ATR'])
+        _autoscale_y(self.atrAxes, VSTOP['ATR'])
+        
+        ax = self.axes[3]
+        self.rsi.set_data(x, RSI)
+        _autoscale_y(ax, [20., 80.], RSI)
+        ax.yaxis.set_major_formatter(FormatStrFormatter('%.'+str(nDigit)+'f'))
+        
+        for ax in self.axes:
+            ax.set_xlim(-.5, nCandles)
+
+    def close(self):
+        with self._lock:
+            self.figure.clear()
+            self.figure = None
+
+# one template per process, built on first use
+_chartTemplate = None
+_chartTemplateLock = threading.Lock()
+
+def chart_template():
+    global _chartTemplate
+    with _chartTemplateLock:
+        if _chartTemplate is None:
+            _chartTemplate = ChartTemplate()
+        return _chartTemplate
+
+def close_chart_template():
+    global _chartTemplate
+    with _chartTemplateLock:
+        if _chartTemplate is not None:
+            _chartTemplate.close()
+            _chartTemplate = None
+
+def render_chart(payload):
+    return chart_template().render(payload)
+
+imageCache = None
+
+def set_image_cache(cache):
+    global imageCache
+    imageCache = cache
+
+def chart_key(market, NUM_PRICE_STEP, TIME_FRAME_STEP, TIME_FRAME, TIME_FRAME_DURATION):
+    # charts are reused until the next candle of the finer time frame closes
+    version = utilities.last_closed_open_time(TIME_FRAME_STEP)
+    if imageCache is None or version is None:
+        return None
+    return imageCache.make_key(market, TIME_FRAME, 
+                               (NUM_PRICE_STEP, TIME_FRAME_STEP, TIME_FRAME_DURATION), version)
+
+def cached_chart(key):
+    if key is None:
+        return None
+    return imageCache.get(key)
+
+def store_chart(key, image):
+    if key is not None:
+        imageCache.put(key, image)
+
+def volume_spread_analysis(client, market, 
+                           NUM_PRICE_STEP, TIME_FRAME_STEP, TIME_FRAME, TIME_FRAME_DURATION):
+    """PNG bytes of the chart, from the image cache when set"""
+    key = chart_key(market, NUM_PRICE_STEP, TIME_FRAME_STEP, TIME_FRAME, TIME_FRAME_DURATION)
+    image = cached_chart(key)
+    if image is None:
+        image = render_chart(chart_data(client, market, NUM_PRICE_STEP, 
+                                        TIME_FRAME_STEP, TIME_FRAME, TIME_FRAME_DURATION))
+        store_chart(key, image)
+    return image
@@ -0,0 +1,111 @@
+from binance_trading_bot import utilities
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class Pipeline(object):
+
+    WORKERS = 4
+
+    def __init__(self, client, max_workers=WORKERS):
+        """Dependency graph of the data a chart needs
+
+        Candles are declared with candles(), derived values with add().
+        run() fetches every distinct (market, interval, duration) once and
+        computes each node once, running nodes whose inputs are ready
+        concurrently.
+
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self._nodes = {}
+        self._sources = {}
+
+    def _add_node(self, name, function, inputs, params):
+        if name in self._nodes:
+            raise ValueError('Pipeline node %s is already declared' % name)
+        self._nodes[name] = (function, inputs, params)
+        return name
+
+    def _source(self, market, timeFrame, timeDuration):
+        key = (market, timeFrame, timeDuration)
+        if key not in self._sources:
+            name = self._sources[key] = '%s %s %s' % key
+            self._add_node(name, utilities.get_candles, (),
+                           {'client': self.client, 'market': market,
+                            'timeFrame': timeFrame, 'timeDuration': timeDuration})
+        return self._sources[key]
+
+    def candles(self, name, market, timeFrame, timeDuration, baseTimeFrame=None):
+        """Declare candles, resampled from baseTimeFrame like utilities.get_candles"""
+        if baseTimeFrame is None and timeFrame not in utilities.KLINE_INTERVALS:
+            baseTimeFrame = utilities.base_time_frame(timeFrame)
+        if baseTimeFrame is not None and baseTimeFrame!=timeFrame and utilities.is_multiple(timeFrame, baseTimeFrame):
+            source = self._source(market, baseTimeFrame, timeDuration)
+            return self._add_node(name, utilities.resample_candles, (source,), {'timeFrame': timeFrame})
+        return self._add_node(name, _identity, (self._source(market, timeFrame, timeDuration),), {})
+
+    def add(self, name, function, inputs=(), **params):
+        """Declare a node computing function from other nodes
+
+        :param inputs: names of the nodes passed positionally, or a dict of
+            keyword argument to node name
+        :param params: constant keyword arguments
+
+        """
+        return self._add_node(name, function, inputs, params)
+
+    def _dependencies(self, name):
+        inputs = self._nodes[name][1]
+        return list(inputs.values()) if isinstance(inputs, dict) else list(inputs)
+
+    def _required(self, outputs):
+        required = set()
+        stack = list(outputs)
+        while stack:
+            name = stack.pop()
+            if name not in required:
+                if name not in self._nodes:
+                    raise ValueError('Pipeline node %s is not declared' % name)
+                required.add(name)
+                stack.extend(self._dependencies(name))
+        return required
+
+    def _call(self, name, results):
+        function, inputs, params = self._nodes[name]
+        if isinstance(inputs, dict):
+            return function(**dict(params, **{k: results[v] for k, v in inputs.items()}))
+        return function(*[results[k] for k in inputs], **params)
+
+    def run(self, outputs=None):
+        """Compute the outputs and what they depend on
+
+        :param outputs: node names, defaults to all nodes
+
+        :return: dict of node name to result
+
+        """
+        required = self._required(self._nodes if outputs is None else outputs)
+        waiting = {name: set(self._dependencies(name)) for name in required}
+        results = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while waiting or running:
+                for name in [name for name, dependencies in waiting.items() if not dependencies]:
+                    del waiting[name]
+                    running[executor.submit(self._call, name, results)] = name
+                if not running:
+                    raise ValueError('Pipeline has a dependency cycle')
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        for future in running:
+                            future.cancel()
+                        raise
+                    for dependencies in waiting.values():
+                        dependencies.discard(name)
+        return results
+
+def _identity(value):
+    return value
@@ -0,0 +1,182 @@
+# coding=utf-8
+
+import asyncio
+import threading
+import time
+
+# request weight of each endpoint, endpoints not listed here weigh 1
+ENDPOINT_WEIGHTS = {
+    'exchangeInfo': 10,
+    'historicalTrades': 5,
+    'account': 5,
+    'myTrades': 5,
+    'allOrders': 5,
+    'margin/allOrders': 5,
+    'margin/myTrades': 5,
+    'balance': 5,
+    'positionRisk': 5,
+    'userTrades': 5,
+    'fundingRate': 1,
+}
+
+# endpoints whose weight grows when no symbol is given
+ALL_SYMBOLS_WEIGHTS = {
+    'ticker/24hr': 40,
+    'ticker/price': 2,
+    'ticker/bookTicker': 2,
+    'ticker/allPrices': 2,
+    'ticker/allBookTickers': 2,
+    'openOrders': 40,
+    'margin/openOrders': 10,
+    'premiumIndex': 10,
+}
+
+# (max limit, weight) pairs for the order book endpoints
+DEPTH_WEIGHTS = ((100, 1), (500, 5), (1000, 10), (5000, 50))
+
+
+def endpoint_path(uri):
+    """Strip scheme, host, api prefix and version from a request uri
+
+    :param uri: i.e. https://api.binance.com/api/v3/ticker/24hr
+    :type uri: str
+
+    :return: str endpoint path, i.e. ticker/24hr
+
+    """
+    return '/'.join(uri.split('/')[5:])
+
+
+def request_weight(uri, params=None):
+    """Request weight Binance charges for a call
+
+    :param uri: request uri
+    :type uri: str
+    :param params: query or body parameters as a dict or a list of pairs
+    :type params: dict
+
+    :return: int weight
+
+    """
+    path = endpoint_path(uri)
+    params = dict(params or {})
+    if path == 'depth':
+        limit = int(params.get('limit', 100))
+        for max_limit, weight in DEPTH_WEIGHTS:
+            if limit <= max_limit:
+                return weight
+        return DEPTH_WEIGHTS[-1][1]
+    if path in ALL_SYMBOLS_WEIGHTS and 'symbol' not in params:
+        return ALL_SYMBOLS_WEIGHTS[path]
+    return ENDPOINT_WEIGHTS.get(path, 1)
+
+
+class RateLimiter(object):
+
+    DEFAULT_LIMIT = 1200  # request weight per interval
+    DEFAULT_INTERVAL = 60  # seconds
+    USED_WEIGHT_HEADER = 'x-mbx-used-weight-1m'
+
+    def __init__(self, limit=DEFAULT_LIMIT, interval=DEFAULT_INTERVAL):
+        """Initialise the RateLimiter
+
+        Token bucket holding the request weight we may still spend. Tokens
+        refill continuously at limit/interval per second, are corrected
+        down whenever Binance reports a higher used weight in the response
+        headers, and are frozen while backing off from a 429 or 418.
+
+        :param limit: request weight allowed per interval
+        :type limit: int
+        :param interval: length of the rate limit window in seconds
+        :type interval: int
+
+        """
+        self.limit = limit
+        self.interval = interval
+        self._rate = float(limit) / interval
+        self._tokens = float(limit)
+        self._updated_at = time.time()
+        self._blocked_until = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        # no tokens are earned while backing off
+        elapsed = now - max(self._updated_at, self._blocked_until)
+        if elapsed > 0:
+            self._tokens = min(self.limit, self._tokens + elapsed * self._rate)
+        self._updated_at = max(self._updated_at, now)
+
+    def _reserve(self, weight):
+        # spend the weight and return 0, or return how long to wait before trying again
+        weight = min(weight, self.limit)
+        with self._lock:
+            now = time.time()
+            self._refill(now)
+            if now >= self._blocked_until and self._tokens >= weight:
+                self._tokens -= weight
+                return 0
+            return max(self._blocked_until - now, (weight - self._tokens) / self._rate)
+
+    def acquire(self, weight=1):
+        """Block until the request weight can be spent without exceeding the limit
+
+        :param weight: weight of the request about to be sent
+        :type weight: int
+
+        """
+        wait = self._reserve(weight)
+        while wait:
+            time.sleep(wait)
+            wait = self._reserve(weight)
+
+    async def acquire_async(self, weight=1):
+        """Coroutine version of acquire that sleeps without blocking the event loop"""
+        wait = self._reserve(weight)
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self._reserve(weight)
+
+    def update_from_headers(self, headers):
+        """Sync the bucket with the used weight reported by Binance
+
+        :param headers: response headers
+        :type headers: dict
+
+        """
+        used = headers.get(self.USED_WEIGHT_HEADER)
+        if used is None:
+            return
+        with self._lock:
+            self._refill(time.time())
+            self._tokens = min(self._tokens, self.limit - int(used))
+
+    def backoff(self, retry_after):
+        """Stop sending requests for retry_after seconds
+
+        :param retry_after: seconds to wait, as sent in the Retry-After header
+        :type retry_after: float
+
+        """
+        with self._lock:
+            now = time.time()
+            self._refill(now)
+            self._tokens = 0
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    @property
+    def budget(self):
+        """Request weight that can be spent right now"""
+        with self._lock:
+            now = time.time()
+            if now < self._blocked_until:
+                return 0
+            self._refill(now)
+            return int(self._tokens)
+
+    def get_status(self):
+        return {
+            'limit': self.limit,
+            'interval': self.interval,
+            'budget': self.budget,
+            'blocked_for': max(0, self._blocked_until - time.time()),
+        }
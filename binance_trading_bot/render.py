@@ -0,0 +1,67 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import sys
+import threading
+
+WARM_UP_TIMEOUT = 60 # seconds
+
+# set before the workers fork, they inherit it
+_barrier = None
+
+def _warm_up():
+    # lays out the chart template, importing matplotlib if the fork did not bring it
+    from binance_trading_bot import owl
+    owl.chart_template()
+
+def _warm_up_once():
+    # a worker blocks here until every worker took one, so none takes two
+    _warm_up()
+    try:
+        _barrier.wait(WARM_UP_TIMEOUT)
+    except threading.BrokenBarrierError:
+        pass
+
+def _ready():
+    pass
+
+class RenderFarm(object):
+
+    def __init__(self, max_workers=None):
+        """Pool of worker processes rendering charts to PNG bytes
+
+        Rendering is CPU bound and holds the GIL, the workers draw charts of
+        one command in parallel. Functions and payloads are pickled to the
+        workers, so payloads should be plain arrays, e.g. owl.chart_data().
+
+        """
+        global _barrier
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # fork, so workers do not re-run the importing script, it is the
+        # default before Python 3.7, which added mp_context and initializer
+        if sys.version_info>=(3, 7):
+            context = multiprocessing.get_context('fork') \
+            if 'fork' in multiprocessing.get_all_start_methods() else None
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=context,
+                                                 initializer=_warm_up)
+        else:
+            _barrier = multiprocessing.Barrier(self.max_workers)
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def warm_up(self):
+        """Start the workers and lay out their chart templates now instead of on the first charts"""
+        # the initializer warms up each worker as it starts, before Python 3.7
+        # one task per worker, kept apart by the barrier
+        task = _ready if sys.version_info>=(3, 7) else _warm_up_once
+        for future in [self._executor.submit(task) for _ in range(self.max_workers)]:
+            future.result()
+
+    def submit(self, function, payload):
+        return self._executor.submit(function, payload)
+
+    def map(self, function, payloads):
+        return self._executor.map(function, payloads)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
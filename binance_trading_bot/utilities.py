@@ -1,20 +1,87 @@
 import numpy as np
 import pandas as pd
+import time
+from binance_trading_bot import enums
+from binance_trading_bot.candles import Candles
+from binance_trading_bot.helpers import date_to_milliseconds, interval_to_milliseconds
+
+KLINES_WORKERS = 8
+
+# intervals served by the exchange, finest first
+KLINE_INTERVALS = [enums.KLINE_INTERVAL_1MINUTE, enums.KLINE_INTERVAL_3MINUTE,
+                   enums.KLINE_INTERVAL_5MINUTE, enums.KLINE_INTERVAL_15MINUTE,
+                   enums.KLINE_INTERVAL_30MINUTE, enums.KLINE_INTERVAL_1HOUR,
+                   enums.KLINE_INTERVAL_2HOUR, enums.KLINE_INTERVAL_4HOUR,
+                   enums.KLINE_INTERVAL_6HOUR, enums.KLINE_INTERVAL_8HOUR,
+                   enums.KLINE_INTERVAL_12HOUR, enums.KLINE_INTERVAL_1DAY,
+                   enums.KLINE_INTERVAL_3DAY, enums.KLINE_INTERVAL_1WEEK]
+
+# weekly candles open on Monday, 4 days after the epoch
+WEEK_OFFSET = 4*24*60*60*1000
+
+# kline fields in REST API order, the trailing "ignore" field is dropped
+KLINE_COLUMNS = ['open_time', 'open', 'high', 'low', 'close', 'assetVolume', 
+                 'close_time', 'quoteVolume', 'n_trades', 
+                 'buyAssetVolume', 'buyQuoteVolume']
+KLINE_INT_COLUMNS = ['open_time', 'close_time', 'n_trades']
+
+# optional KlineStore serving get_candles from disk
+klineStore = None
+
+def set_kline_store(store):
+    global klineStore
+    klineStore = store
+
+class MarketSnapshot(object):
+
+    def __init__(self, client):
+        """Products and 24h tickers of all markets from one call each
+
+        Market lists and breadth statistics for any grouping are computed
+        from the same frame instead of downloading both lists again.
+
+        """
+        products = pd.DataFrame(client.get_products()['data'])
+        tickers = pd.DataFrame(client.get_ticker())
+        markets = pd.DataFrame()
+        markets['symbol'] = products['symbol']
+        markets['baseAsset'] = products['baseAsset']
+        markets['quoteAsset'] = products['quoteAsset']
+        markets['parentMarket'] = products['parentMarket']
+        markets['volume_24h'] = pd.to_numeric(products['tradedMoney'])
+        changes = pd.DataFrame()
+        changes['symbol'] = tickers['symbol']
+        changes['change_24h'] = pd.to_numeric(tickers['priceChangePercent'])
+        self.markets = pd.merge(markets, changes, on='symbol')
+        self.products = products
+
+    def market_list(self, quoteAsset=None):
+        markets = self.markets
+        if quoteAsset is not None:
+            markets = markets[markets['quoteAsset']==quoteAsset]
+        return markets[['symbol', 'volume_24h', 'change_24h']].reset_index(drop=True)
+
+    def breadth(self, by='parentMarket'):
+        """Advancing and declining pairs and volume weighted change of every group
+
+        :param by: column or list of columns to group by, i.e. parentMarket or quoteAsset
+
+        """
+        markets = self.markets
+        advancing = markets['change_24h']>=0.
+        grouped = pd.DataFrame({'advancing': advancing,
+                                'declining': ~advancing,
+                                'volume': markets['volume_24h'],
+                                'weighted_change': markets['change_24h']*markets['volume_24h']})
+        keys = [markets[k] for k in by] if isinstance(by, list) else markets[by]
+        breadth = grouped.groupby(keys).sum()
+        breadth['pairs'] = breadth['advancing']+breadth['declining']
+        breadth['breadth'] = breadth['advancing']/breadth['pairs']
+        breadth['weighted_change'] = breadth['weighted_change']/breadth['volume']
+        return breadth
 
 def get_market_list(client, *args):
-    marketList = pd.DataFrame(client.get_products()['data'])
-    if len(args)>0:
-        quoteBase = args[0]
-        marketList = marketList[marketList['quoteAsset']==quoteBase]
-    marketList['volume_24h'] = marketList['tradedMoney']
-    marketList = marketList[['symbol', 'volume_24h']]
-    tickers = pd.DataFrame(client.get_ticker())
-    tickers['priceChangePercent'] = pd.to_numeric(tickers['priceChangePercent'])
-    tickerList = pd.DataFrame()
-    tickerList['symbol'] = tickers['symbol']
-    tickerList['change_24h'] = tickers['priceChangePercent']
-    marketList = pd.merge(marketList, tickerList, on='symbol')
-    return marketList
+    return MarketSnapshot(client).market_list(*args)
 
 def market_classify(client):
     marketList = pd.DataFrame(client.get_products()['data'])
@@ -27,9 +94,7 @@ def market_classify(client):
     return btcOnlyMarketList, usdtOnlyMarketList
 
 def get_trades(client, market, timeDuration, timeFrame):
-    klines = client.get_historical_klines(symbol=market, 
-                                          interval=timeFrame, 
-                                          start_str=timeDuration)
+    klines = get_klines(client, market, timeFrame, timeDuration)
     n_transactions = sum([item[8] for item in klines])
     toId = client.get_historical_trades(symbol=market, limit=1)[0]['id']
     listId = np.arange(toId-n_transactions+1, toId-10,500)
@@ -37,39 +102,109 @@ def get_trades(client, market, timeDuration, timeFrame):
     for fromId in listId:
         trades = trades+client.get_historical_trades(symbol=market, 
                                                      fromId=str(fromId))
-    trades = pd.DataFrame(trades)
-    trades['price'] = pd.to_numeric(trades['price'])
-    trades['qty'] = pd.to_numeric(trades['qty'])
-    trades['time'] = pd.to_datetime(trades['time'], unit='ms')
+    trades = decode_records(trades, floatFields=('price', 'qty', 'quoteQty'), 
+                            intFields=('id',), timeFields=('time',))
     return trades
 
-def get_candles(client, market, timeFrame, timeDuration):
-    klines = client.get_historical_klines(symbol=market, 
-                                          interval=timeFrame, 
-                                          start_str=timeDuration)
-    klines = pd.DataFrame(klines)    
-    candles = pd.DataFrame()  
-    candles['open_time'] = klines[0]
-    candles['close_time'] = klines[6]
-    candles['n_trades'] = klines[8]
-    candles['open'] = pd.to_numeric(klines[1])
-    candles['high'] = pd.to_numeric(klines[2])
-    candles['low'] = pd.to_numeric(klines[3])
-    candles['close'] = pd.to_numeric(klines[4])
-    candles['assetVolume'] = pd.to_numeric(klines[5])
-    candles['buyAssetVolume'] = pd.to_numeric(klines[9])
-    candles['sellAssetVolume'] = candles['assetVolume']-candles['buyAssetVolume']
-    candles['quoteVolume'] = pd.to_numeric(klines[7])
-    candles['buyQuoteVolume'] = pd.to_numeric(klines[10])
-    candles['sellQuoteVolume'] = candles['quoteVolume']-candles['buyQuoteVolume']
-    candles['spread'] = candles['high']-candles['low']
-    return candles
+def get_klines(client, market, timeFrame, timeDuration):
+    if klineStore is not None:
+        return klineStore.get_klines(client, market, timeFrame, 
+                                     date_to_milliseconds(timeDuration))
+    return client.get_historical_klines(symbol=market, 
+                                        interval=timeFrame, 
+                                        start_str=timeDuration,
+                                        max_workers=KLINES_WORKERS)
+
+def is_multiple(timeFrame, baseTimeFrame):
+    step = interval_to_milliseconds(timeFrame)
+    baseStep = interval_to_milliseconds(baseTimeFrame)
+    if step is None or baseStep is None or step<baseStep:
+        return False
+    offset = WEEK_OFFSET if timeFrame[-1]=='w' else 0
+    return step%baseStep==0 and offset%baseStep==0
+
+def base_time_frame(timeFrame):
+    for baseTimeFrame in reversed(KLINE_INTERVALS):
+        if is_multiple(timeFrame, baseTimeFrame):
+            return baseTimeFrame
+    return None
+
+def last_closed_open_time(timeFrame, now=None):
+    step = interval_to_milliseconds(timeFrame)
+    if step is None:
+        return None
+    if now is None:
+        now = int(time.time()*1000)
+    offset = WEEK_OFFSET if timeFrame[-1]=='w' else 0
+    return (now-offset)//step*step+offset-step
+
+def resample_candles(candles, timeFrame, dropPartial=True):
+    step = interval_to_milliseconds(timeFrame)
+    offset = WEEK_OFFSET if timeFrame[-1]=='w' else 0
+    openTime = candles['open_time']
+    bucket = (openTime-offset)//step*step+offset
+    starts = np.flatnonzero(np.r_[True, bucket[1:]!=bucket[:-1]])
+    ends = np.r_[starts[1:], len(bucket)]-1
+    if dropPartial and len(starts)>0 and openTime[0]!=bucket[0]:
+        starts = starts[1:]
+        ends = ends[1:]
+    if len(starts)==0:
+        return candles[:0]
+    columns = {}
+    columns['open_time'] = bucket[starts]
+    columns['close_time'] = bucket[starts]+step-1
+    for column in ['n_trades', 'assetVolume', 'buyAssetVolume', 
+                   'quoteVolume', 'buyQuoteVolume']:
+        columns[column] = np.add.reduceat(candles[column], starts)
+    columns['open'] = candles['open'][starts]
+    columns['high'] = np.maximum.reduceat(candles['high'], starts)
+    columns['low'] = np.minimum.reduceat(candles['low'], starts)
+    columns['close'] = candles['close'][ends]
+    return Candles(columns)
+
+def get_candles(client, market, timeFrame, timeDuration, baseTimeFrame=None):
+    # intervals the exchange does not serve are built from the largest one dividing them
+    if baseTimeFrame is None and timeFrame not in KLINE_INTERVALS:
+        baseTimeFrame = base_time_frame(timeFrame)
+    if baseTimeFrame is not None and baseTimeFrame!=timeFrame and is_multiple(timeFrame, baseTimeFrame):
+        candles = get_candles(client, market, baseTimeFrame, timeDuration)
+        return resample_candles(candles, timeFrame)
+    return candles_from_klines(get_klines(client, market, timeFrame, timeDuration))
+
+def candles_from_klines(klines):
+    return Candles(decode_klines(klines))
+
+def decode_klines(klines):
+    # one conversion of every field into a block holding one contiguous row per column
+    n = len(KLINE_COLUMNS)
+    if len(klines)==0:
+        block = np.empty((n, 0))
+    else:
+        block = np.ascontiguousarray(np.array(klines, dtype=np.float64)[:, :n].T)
+    columns = dict(zip(KLINE_COLUMNS, block))
+    for column in KLINE_INT_COLUMNS:
+        columns[column] = columns[column].astype(np.int64)
+    return columns
+
+def decode_records(records, floatFields=(), intFields=(), timeFields=()):
+    columns = {}
+    for field in records[0] if len(records)>0 else ():
+        values = [record[field] for record in records]
+        if field in floatFields:
+            columns[field] = np.array(values, dtype=np.float64)
+        elif field in intFields or field in timeFields:
+            columns[field] = np.array(values, dtype=np.int64)
+        else:
+            columns[field] = values
+    for field in timeFields:
+        if field in columns:
+            columns[field] = pd.to_datetime(columns[field], unit='ms')
+    return pd.DataFrame(columns)
 
 def get_funding_rate(client, market):
     fundingRate = client.futures_funding_rate(symbol=market)
-    fundingRate = pd.DataFrame(fundingRate)[['fundingTime', 'fundingRate']] 
-    fundingRate['fundingRate'] = pd.to_numeric(fundingRate['fundingRate'])
-    fundingRate['fundingTime'] = pd.to_datetime(fundingRate['fundingTime'], unit='ms')
+    fundingRate = decode_records(fundingRate, floatFields=('fundingRate',), 
+                                 timeFields=('fundingTime',))[['fundingTime', 'fundingRate']]
     return fundingRate
 
 
@@ -1,25 +1,43 @@
 from matplotlib import colors as mcolors
 from matplotlib.collections import LineCollection, PolyCollection
+import numpy as np
+
+def _candlestick_geometry(opens, highs, lows, closes, width, colorup, colordown, alpha, shift):
+    opens = np.asarray(opens, dtype=float)
+    highs = np.asarray(highs, dtype=float)
+    lows = np.asarray(lows, dtype=float)
+    closes = np.asarray(closes, dtype=float)
+    delta = width/2.
+    x = np.arange(len(opens), dtype=float)
+    
+    # (N, 4, 2) bar corners and (N, 2, 2) range segments, -1 marks missing candles
+    hasBar = (opens != -1) & (closes != -1)
+    left = x[hasBar] - delta + shift
+    right = x[hasBar] + delta + shift
+    open, close = opens[hasBar], closes[hasBar]
+    barVerts = np.empty((len(left), 4, 2))
+    barVerts[:, :, 0] = np.column_stack([left, left, right, right])
+    barVerts[:, :, 1] = np.column_stack([open, close, close, open])
+    hasRange = lows != -1
+    rangeSegments = np.empty((np.count_nonzero(hasRange), 2, 2))
+    rangeSegments[:, :, 0] = np.arange(len(lows), dtype=float)[hasRange, None]
+    rangeSegments[:, 0, 1] = lows[hasRange]
+    rangeSegments[:, 1, 1] = highs[hasRange]
+    
+    palette = np.array([mcolors.to_rgba(colordown, alpha), mcolors.to_rgba(colorup, alpha)])
+    colors = palette[(open < close).astype(int)]
+    minx, maxx = 0, len(rangeSegments)
+    miny = np.nanmin(lows[hasRange]) if hasRange.any() else 0
+    maxy = np.nanmax(highs[highs != -1]) if (highs != -1).any() else 0
+    corners = (minx, miny), (maxx, maxy)
+    return barVerts, rangeSegments, colors, corners
 
 def candlestick2_ohlc(ax, opens, highs, lows, closes, 
                       width=4, colorup='k', colordown='r', 
                       alpha=0.75, shift=0):
-    delta = width/2.
-    barVerts = [((i - delta + shift, open),
-                 (i - delta + shift, close),
-                 (i + delta + shift, close),
-                 (i + delta + shift, open))
-                for i, open, close in zip(range(len(opens)), opens, closes)
-                if open != -1 and close != -1]
-    rangeSegments = [((i, low), (i, high))
-                     for i, low, high in zip(range(len(lows)), lows, highs)
-                     if low != -1]
-    colorup = mcolors.to_rgba(colorup, alpha)
-    colordown = mcolors.to_rgba(colordown, alpha)
-    colord = {True: colorup, False: colordown}
-    colors = [colord[open < close]
-              for open, close in zip(opens, closes)
-              if open != -1 and close != -1]
+    barVerts, rangeSegments, colors, corners = _candlestick_geometry(opens, highs, lows, closes, 
+                                                                     width, colorup, colordown, 
+                                                                     alpha, shift)
     useAA = 0
     lw = 0.5
     rangeCollection = LineCollection(rangeSegments,
@@ -31,13 +49,80 @@ def candlestick2_ohlc(ax, opens, highs, lows, closes,
                                    edgecolors=colors,
                                    antialiaseds=useAA,
                                    linewidths=lw)
-    minx, maxx = 0, len(rangeSegments)
-    miny = min([low for low in lows if low != -1])
-    maxy = max([high for high in highs if high != -1])
-    corners = (minx, miny), (maxx, maxy)
     ax.update_datalim(corners)
     ax.autoscale_view()
     if shift==0:
         ax.add_collection(rangeCollection)
     ax.add_collection(barCollection)
-    return rangeCollection, barCollection
\ No newline at end of file
+    return rangeCollection, barCollection
+
+def update_candlestick2_ohlc(collections, opens, highs, lows, closes, 
+                             width=4, colorup='k', colordown='r', 
+                             alpha=0.75, shift=0):
+    """Replace the candles of the collections returned by candlestick2_ohlc
+
+    :return: the (min, max) corners of the new candles
+    
+    """
+    rangeCollection, barCollection = collections
+    barVerts, rangeSegments, colors, corners = _candlestick_geometry(opens, highs, lows, closes, 
+                                                                     width, colorup, colordown, 
+                                                                     alpha, shift)
+    rangeCollection.set_segments(rangeSegments)
+    rangeCollection.set_color(colors)
+    barCollection.set_verts(barVerts)
+    barCollection.set_facecolor(colors)
+    barCollection.set_edgecolor(colors)
+    return corners
+
+def _volume_geometry(bars):
+    # bars of every series in one (N, 4, 2) array, later series drawn on top
+    vertList = []
+    colorList = []
+    maxy = 0
+    for volumes, width, color, alpha, shift in bars:
+        volumes = np.asarray(volumes, dtype=float)
+        x = np.arange(len(volumes), dtype=float)
+        left = x - width/2. + shift
+        right = x + width/2. + shift
+        zero = np.zeros(len(volumes))
+        verts = np.empty((len(volumes), 4, 2))
+        verts[:, :, 0] = np.column_stack([left, left, right, right])
+        verts[:, :, 1] = np.column_stack([zero, volumes, volumes, zero])
+        vertList.append(verts)
+        colorList.append(np.tile(mcolors.to_rgba(color, alpha), (len(volumes), 1)))
+        if len(volumes):
+            maxy = max(maxy, np.nanmax(volumes))
+    if not vertList:
+        return np.empty((0, 4, 2)), np.empty((0, 4)), ((0, 0), (0, 0))
+    corners = (0, 0), (max(len(v) for v in vertList), maxy)
+    return np.concatenate(vertList), np.concatenate(colorList), corners
+
+def volume_bars(ax, bars):
+    """Bars from 0 of several volume series as a single PolyCollection
+
+    :param bars: list of (volumes, width, color, alpha, shift) of every series
+
+    """
+    barVerts, colors, corners = _volume_geometry(bars)
+    barCollection = PolyCollection(barVerts,
+                                   facecolors=colors,
+                                   edgecolors=colors,
+                                   antialiaseds=0,
+                                   linewidths=0.5)
+    ax.update_datalim(corners)
+    ax.autoscale_view()
+    ax.add_collection(barCollection)
+    return barCollection
+
+def update_volume_bars(barCollection, bars):
+    """Replace the bars of a collection returned by volume_bars
+
+    :return: the (min, max) corners of the new bars
+
+    """
+    barVerts, colors, corners = _volume_geometry(bars)
+    barCollection.set_verts(barVerts)
+    barCollection.set_facecolor(colors)
+    barCollection.set_edgecolor(colors)
+    return corners
@@ -1,9 +1,14 @@
 import os
+from io import BytesIO
 import telegram
 from telegram import ParseMode
 from telegram.ext import Updater, CommandHandler
 from binance_trading_bot.client import Client
-from binance_trading_bot import analysis, market, owl
+from binance_trading_bot.cache import ImageCache, IndicatorCache
+from binance_trading_bot.klinestore import KlineStore
+from binance_trading_bot.marketstate import MarketStateManager
+from binance_trading_bot.render import RenderFarm
+from binance_trading_bot import analysis, indicator, market, owl, utilities
 import tweepy
 
 INTRO_TEXT = """
@@ -69,14 +74,27 @@ twitterAuth = tweepy.OAuthHandler(os.environ['CONSUMER_KEY'], os.environ['CONSUM
 twitterAuth.set_access_token(os.environ['ACCESS_TOKEN'], os.environ['ACCESS_TOKEN_SECRET'])
 twitterApi = tweepy.API(twitterAuth)
 
-client = Client(os.environ['BINANCE_API_KEY'], os.environ['BINANCE_SECRET_KEY'])
+# chart workers are forked before any client or socket thread starts
+renderFarm = RenderFarm()
+renderFarm.warm_up()
+
+client = Client(os.environ['BINANCE_API_KEY'], os.environ['BINANCE_SECRET_KEY'],
+                exchange_info_path='data/exchange_info.json')
+utilities.set_kline_store(KlineStore('data/klines.db'))
+indicator.set_indicator_cache(IndicatorCache())
+owl.set_image_cache(ImageCache())
+# market-wide 24h statistics kept current from the all market ticker stream
+marketStateManager = MarketStateManager(client)
+
+# seconds after which /a answers with the markets scanned so far
+ALTCOIN_SCAN_TIMEOUT = 120
 
 # Altcoin scan
 def a(bot, update):
     bot.send_chat_action(chat_id=update.message.chat_id, 
                          action=telegram.ChatAction.TYPING)
     if str(update.message.from_user.username)==TELEGRAM_ADMIN_USERNAME:
-        market.altcoin_scan(client)
+        market.altcoin_scan(client, timeout=ALTCOIN_SCAN_TIMEOUT)
         bot.send_document(chat_id=update.message.chat_id, document=open('data/market_list_btc.csv', 'rb'))
         bot.send_document(chat_id=update.message.chat_id, document=open('data/market_list_usdt.csv', 'rb'))
 
@@ -106,46 +124,66 @@ def s(bot, update, args):
                          disable_web_page_preview=True)
 
 # Technical analysis
+def chart_jobs(args):
+    NUM_PRICE_STEP = 40
+    TIME_FRAME_STEP = '1h'
+    TIME_FRAME = '1d'
+    TIME_FRAME_DURATION = '60 days ago UTC'
+    if args[-1][0].isdigit():
+        if args[-1][-3:]=='UTC':
+            TIME_FRAME_DURATION = args[-1].replace('_', ' ')
+        else:
+            TIME_FRAME_DURATION = args[-1]+' days ago UTC'
+    try:
+        if args[-2][0].isdigit():
+            TIME_FRAME = args[-2]
+    except Exception:
+        pass
+    try:
+        if args[-3][0].isdigit():
+            TIME_FRAME_STEP = args[-3]
+    except Exception:
+        pass
+    try:
+        if args[-4][0].isdigit():
+            NUM_PRICE_STEP = int(args[-4])
+    except Exception:
+        pass
+    coinList = []
+    for arg in args:
+        if not arg.isdigit():
+            coinList.append(arg)
+        else:
+            break
+    jobList = []
+    for coin in coinList:
+        coin = coin.upper()
+        for MARKET in [coin, coin+'BTC', coin+'USDT']:
+            if client.is_valid_symbol(MARKET):
+                jobList.append((MARKET, NUM_PRICE_STEP, TIME_FRAME_STEP, TIME_FRAME, TIME_FRAME_DURATION))
+    return jobList
+
+def send_charts(bot, update, jobList):
+    # data is fetched here while the workers draw the charts already fetched
+    chartList = []
+    for job in jobList:
+        key = owl.chart_key(*job)
+        image = owl.cached_chart(key)
+        future = None
+        if image is None:
+            future = renderFarm.submit(owl.render_chart, owl.chart_data(client, *job))
+        chartList.append((key, image, future))
+    for key, image, future in chartList:
+        if future is not None:
+            image = future.result()
+            owl.store_chart(key, image)
+        bot.send_photo(chat_id=update.message.chat_id, photo=BytesIO(image))
+
 def x(bot, update, args):
     bot.send_chat_action(chat_id=update.message.chat_id, 
                          action=telegram.ChatAction.TYPING)
     if str(update.message.from_user.username)==TELEGRAM_ADMIN_USERNAME:
-        NUM_PRICE_STEP = 40
-        TIME_FRAME_STEP = '1h'
-        TIME_FRAME = '1d'
-        TIME_FRAME_DURATION = '60 days ago UTC'
-        if args[-1][0].isdigit():
-            if args[-1][-3:]=='UTC':
-                TIME_FRAME_DURATION = args[-1].replace('_', ' ')
-            else:
-                TIME_FRAME_DURATION = args[-1]+' days ago UTC'
-        try:
-            if args[-2][0].isdigit():
-                TIME_FRAME = args[-2]
-        except Exception:
-            pass
-        try:
-            if args[-3][0].isdigit():
-                TIME_FRAME_STEP = args[-3]
-        except Exception:
-            pass
-        try:
-            if args[-4][0].isdigit():
-                NUM_PRICE_STEP = int(args[-4])
-        except Exception:
-            pass
-        coinList = []
-        for arg in args:
-            if not arg.isdigit():
-                coinList.append(arg)
-            else:
-                break
-        for coin in coinList:
-            coin = coin.upper()
-            for MARKET in [coin, coin+'BTC', coin+'USDT']:
-                owl.volume_spread_analysis(client, MARKET, NUM_PRICE_STEP, TIME_FRAME_STEP, TIME_FRAME, TIME_FRAME_DURATION)
-                bot.send_photo(chat_id=update.message.chat_id, 
-                           photo=open('img/'+MARKET+'_'+TIME_FRAME.upper()+'.png', 'rb'))
+        send_charts(bot, update, chart_jobs(args))
 
 # Exchange on-chain flows
 def b(bot, update):
@@ -192,7 +230,7 @@ def m(bot, update):
     bot.send_chat_action(chat_id=update.message.chat_id, 
                          action=telegram.ChatAction.TYPING)
     if str(update.message.from_user.username)==TELEGRAM_ADMIN_USERNAME:
-        msg = market.market_change(client)
+        msg = market.market_change(client, marketStateManager.get_market_state())
         bot.send_message(chat_id=update.message.chat_id, 
                          text=msg, 
                          parse_mode=ParseMode.MARKDOWN, 
@@ -224,18 +262,23 @@ def n(bot, update):
 # BTC
 def v(bot, update, args):
     if str(update.message.from_user.username)==TELEGRAM_ADMIN_USERNAME:
+        bot.send_chat_action(chat_id=update.message.chat_id, 
+                             action=telegram.ChatAction.TYPING)
         try:
             market = args[0].upper()+'USDT'
         except Exception:
             market = 'BTCUSDT'
-        x(bot, update, [market, '40', '1m', '15m', '2'])
-        x(bot, update, [market, '40', '3m', '30m', '4'])
-        x(bot, update, [market, '40', '5m', '1h', '7'])
-        x(bot, update, [market, '40', '15m', '2h', '15'])
-        x(bot, update, [market, '40', '30m', '4h', '30'])
-        x(bot, update, [market, '40', '30m', '6h', '45'])
-        x(bot, update, [market, '40', '1h', '12h', '60'])
-        x(bot, update, [market, '40', '1h', '1d', '120'])
+        jobList = []
+        for argList in [[market, '40', '1m', '15m', '2'],
+                        [market, '40', '3m', '30m', '4'],
+                        [market, '40', '5m', '1h', '7'],
+                        [market, '40', '15m', '2h', '15'],
+                        [market, '40', '30m', '4h', '30'],
+                        [market, '40', '30m', '6h', '45'],
+                        [market, '40', '1h', '12h', '60'],
+                        [market, '40', '1h', '1d', '120']]:
+            jobList += chart_jobs(argList)
+        send_charts(bot, update, jobList)
 
 # Manual
 def manual(bot,update):
@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import hmac
+import socket
+import time
+
+from aiohttp import web
+
+from binance_trading_bot.async_client import AsyncClient
+
+API_KEY = 'key'
+API_SECRET = 'secret'
+HOUR = 3600000
+
+
+class _FakeBinance(object):
+
+    def __init__(self, delay=.02):
+        # serves klines of hourly candles and counts the requests in flight
+        self.delay = delay
+        self.inFlight = 0
+        self.maxInFlight = 0
+        self.tickerCalls = 0
+        self.app = web.Application()
+        self.app.router.add_get('/api/v1/ping', self.ping)
+        self.app.router.add_get('/api/v1/klines', self.klines)
+        self.app.router.add_get('/api/v1/ticker/24hr', self.ticker)
+        self.app.router.add_get('/api/v3/account', self.account)
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        site = web.SockSite(self.runner, sock)
+        await site.start()
+        return 'http://127.0.0.1:%d/api' % sock.getsockname()[1]
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    async def ping(self, request):
+        return web.json_response({})
+
+    async def klines(self, request):
+        self.inFlight += 1
+        self.maxInFlight = max(self.maxInFlight, self.inFlight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.inFlight -= 1
+        start = int(request.query['startTime'])
+        end = int(request.query.get('endTime', start+HOUR*int(request.query['limit'])-1))
+        return web.json_response([[t, '1.0', '2.0', '0.5', '1.5', '10.0', t+HOUR-1]
+                                  for t in range(start, end+1, HOUR)])
+
+    async def ticker(self, request):
+        self.tickerCalls += 1
+        if self.tickerCalls==1:
+            return web.json_response({'code': -1003}, status=429, headers={'Retry-After': '0.2'})
+        return web.json_response({'symbol': request.query['symbol'], 'lastPrice': '1.0'})
+
+    async def account(self, request):
+        query = [(k, v) for k, v in request.query.items() if k!='signature']
+        signature = hmac.new(API_SECRET.encode('utf-8'),
+                             '&'.join('%s=%s' % item for item in query).encode('utf-8'),
+                             hashlib.sha256).hexdigest()
+        if request.headers.get('X-MBX-APIKEY')!=API_KEY or request.query.get('signature')!=signature:
+            return web.json_response({'code': -1022}, status=401)
+        return web.json_response({'balances': [{'asset': 'BTC', 'free': '1.0'}]})
+
+
+def _run(test, **kwargs):
+    # the client is created outside the loop, as a bot creates it at start up
+    client = AsyncClient(API_KEY, API_SECRET, **kwargs)
+    server = _FakeBinance()
+
+    async def main():
+        client.API_URL = await server.start()
+        try:
+            return await test(client, server)
+        finally:
+            await client.close_connection()
+            await server.stop()
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+def test_get_klines():
+    async def test(client, server):
+        return await client.get_klines(symbol='BTCUSDT', interval='1h', limit=3,
+                                       startTime=0, endTime=3*HOUR-1)
+    klines = _run(test)
+    assert [kline[0] for kline in klines] == [0, HOUR, 2*HOUR]
+
+
+def test_gather_is_bounded_by_max_concurrency():
+    async def test(client, server):
+        return await asyncio.gather(*[
+            client.get_klines(symbol='BTCUSDT', interval='1h', limit=1,
+                              startTime=i*HOUR, endTime=(i+1)*HOUR-1)
+            for i in range(20)]), server.maxInFlight
+    pages, maxInFlight = _run(test, max_concurrency=4)
+    assert [page[0][0] for page in pages] == [i*HOUR for i in range(20)]
+    assert 1 < maxInFlight <= 4
+
+
+def test_signed_endpoint():
+    async def test(client, server):
+        return await client.get_asset_balance('btc')
+    assert _run(test) == {'asset': 'BTC', 'free': '1.0'}
+
+
+def test_retry_after_429():
+    async def test(client, server):
+        start = time.time()
+        ticker = await client.get_ticker(symbol='BTCUSDT')
+        return ticker, time.time()-start, server.tickerCalls
+    ticker, elapsed, calls = _run(test)
+    assert ticker['lastPrice'] == '1.0'
+    assert calls == 2
+    assert elapsed >= .2
+
+
+def test_create_binds_to_running_loop():
+    async def create_then_close():
+        # ping goes to the fake server through an API_URL set on the class
+        server = _FakeBinance()
+        url = await server.start()
+        try:
+            AsyncClient.API_URL, original = url, AsyncClient.API_URL
+            try:
+                client = await AsyncClient.create(API_KEY, API_SECRET)
+            finally:
+                AsyncClient.API_URL = original
+            assert client.session is not None
+            await client.close_connection()
+            assert client.session is None
+        finally:
+            await server.stop()
+
+    for _ in range(2):
+        # one client per loop, nothing is bound to a previous loop
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(create_then_close())
+        finally:
+            loop.close()
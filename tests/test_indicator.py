@@ -0,0 +1,175 @@
+import time
+
+import numpy as np
+import pytest
+
+from binance_trading_bot import indicator
+from binance_trading_bot.cache import IndicatorCache
+from binance_trading_bot.candles import Candles
+
+
+def _candles(n, seed=0):
+    rng = np.random.RandomState(seed)
+    close = 100+np.cumsum(rng.normal(size=n))
+    open = close+rng.normal(size=n)
+    high = np.maximum(open, close)+rng.uniform(.1, 1., size=n)
+    low = np.minimum(open, close)-rng.uniform(.1, 1., size=n)
+    buyQuoteVolume = rng.uniform(1., 10., size=n)
+    sellQuoteVolume = rng.uniform(1., 10., size=n)
+    return {'open': open, 'high': high, 'low': low, 'close': close,
+            'buyQuoteVolume': buyQuoteVolume, 'sellQuoteVolume': sellQuoteVolume}
+
+
+@pytest.mark.parametrize('mode', ['close', 'spread'])
+def test_profile_keeps_volume_when_every_candle_has_range(mode):
+    candles = _candles(2000)
+    profile = indicator.profile(candles, 40, mode=mode)
+    assert len(profile) == 40
+    assert profile['buy_volume'].sum() == pytest.approx(candles['buyQuoteVolume'].sum())
+    assert profile['sell_volume'].sum() == pytest.approx(candles['sellQuoteVolume'].sum())
+
+
+def test_profile_spread_with_candles_without_range():
+    candles = _candles(200)
+    candles['high'][::10] = candles['low'][::10] = candles['close'][::10]
+    profile = indicator.profile(candles, 40, mode='spread')
+    assert profile['volume'].sum() == pytest.approx(
+        candles['buyQuoteVolume'].sum()+candles['sellQuoteVolume'].sum())
+
+
+def _hourly_candles(n, seed=0):
+    candles = _candles(n, seed)
+    candles['open_time'] = 1500000000000+3600000*np.arange(n, dtype=np.int64)
+    return candles
+
+
+def _window(candles, start, end):
+    return {k: v[start:end] for k, v in candles.items()}
+
+
+def _assert_matches_profile(indexProfile, candles, mode, priceStep):
+    # profile with bins of priceStep aligned to priceStep shares the edges of the index
+    low = candles['low' if mode=='spread' else 'close'].min()
+    offset = int(round((np.floor(low/priceStep)*priceStep-indexProfile['price_min'].iloc[0])/priceStep))
+    expected = indicator.profile(candles, len(indexProfile)-offset, mode=mode, tickSize=priceStep)
+    assert not indexProfile['volume'].values[:offset].any()
+    np.testing.assert_allclose(indexProfile['price_min'].values[offset:], expected['price_min'].values)
+    for column in ['buy_volume', 'sell_volume']:
+        np.testing.assert_allclose(indexProfile[column].values[offset:], expected[column].values,
+                                   atol=1e-9)
+
+
+@pytest.mark.parametrize('mode', ['close', 'spread'])
+def test_profile_index_window_matches_profile(mode):
+    candles = _hourly_candles(500)
+    index = indicator.VolumeProfileIndex(_window(candles, 0, 300), .25, mode)
+    index.append(candles)
+    window = _window(candles, 120, 450)
+    _assert_matches_profile(index.profile(window['open_time'][0], window['open_time'][-1]),
+                            window, mode, .25)
+
+
+@pytest.mark.parametrize('mode', ['close', 'spread'])
+def test_profile_index_sessions_match_profile(mode):
+    candles = _hourly_candles(100)
+    index = indicator.VolumeProfileIndex(candles, .25, mode)
+    sessions = index.session_profiles('1d')
+    day = (candles['open_time']//86400000)*86400000
+    assert [session for session, _ in sessions] == list(np.unique(day))
+    for session, sessionProfile in sessions:
+        _assert_matches_profile(sessionProfile, _window(candles, *np.flatnonzero(day==session)[[0, -1]]+[0, 1]),
+                                mode, .25)
+
+
+def test_profile_index_grows_by_bounded_steps():
+    candles = _hourly_candles(10010)
+    index = indicator.VolumeProfileIndex(_window(candles, 0, 10000), None, 'spread')
+    bins = index.cumulative.shape[2]
+    top = index.edges[-1]
+    copies = 0
+    for i in range(10000, 10010):
+        # every candle trades one bin above the previous one, out of the initial grid
+        candles['high'][i] = candles['low'][i] = top+(i-10000+.5)*index.priceStep
+        cumulative = index.cumulative
+        index.append(_window(candles, 0, i+1))
+        copies += index.cumulative is not cumulative
+    assert len(index) == 10010
+    assert len(index.cumulative) <= 1.25*10000+1
+    assert index.cumulative.shape[2] <= 1.2*bins
+    assert copies == 1
+    assert index.profile()['volume'].sum() == pytest.approx(
+        candles['buyQuoteVolume'].sum()+candles['sellQuoteVolume'].sum())
+
+
+def test_profile_index_trim_keeps_later_windows():
+    candles = _hourly_candles(300)
+    index = indicator.VolumeProfileIndex(candles, .25, 'spread')
+    before = index.profile(candles['open_time'][200])
+    assert index.trim(candles['open_time'][200]) == 200
+    assert len(index) == 100
+    assert index.nbytes < (300+1)*2*index.cumulative.shape[2]*8
+    np.testing.assert_allclose(index.profile(candles['open_time'][200])['volume'].values,
+                               before['volume'].values)
+    np.testing.assert_allclose(index.profile()['volume'].values, before['volume'].values)
+
+
+def _forming_candles(n, lastClose):
+    # hourly candles, the last one still forming
+    step = 3600000
+    openTime = (int(time.time()*1000)//step-np.arange(n)[::-1])*step
+    candles = _candles(n)
+    candles['close'][-1] = lastClose
+    candles['high'][-1] = max(candles['high'][-1], lastClose)
+    candles['low'][-1] = min(candles['low'][-1], lastClose)
+    candles.update({'open_time': openTime, 'close_time': openTime+step-1})
+    return Candles(candles)
+
+
+@pytest.fixture
+def indicatorCache():
+    indicator.set_indicator_cache(IndicatorCache())
+    yield indicator.indicatorCache
+    indicator.set_indicator_cache(None)
+
+
+def _live_bbands(candles):
+    BBANDS, bands = indicator.cached('X', '1h', 'bbands', (), candles,
+                                     lambda c: (indicator.bbands(c), indicator.BollingerBands(20, 2, c)))
+    return indicator.with_forming(BBANDS, candles, bands.update_last)
+
+
+def test_cached_indicator_follows_forming_candle(indicatorCache):
+    _live_bbands(_forming_candles(200, 90.))
+    candles = _forming_candles(200, 140.)
+    BBANDS = _live_bbands(candles)
+    assert indicatorCache.get_stats()['hits'] == 1
+    np.testing.assert_allclose(BBANDS.values, indicator.bbands(candles).values)
+
+
+def test_cached_indicator_keyed_on_window(indicatorCache):
+    _live_bbands(_forming_candles(200, 90.))
+    candles = _forming_candles(168, 90.)
+    BBANDS = _live_bbands(candles)
+    assert indicatorCache.get_stats()['hits'] == 0
+    assert len(BBANDS) == len(candles)
+
+
+def test_volatility_stop_update_last():
+    candles = _forming_candles(100, 120.)
+    closed = candles[:-1]
+    vstop = indicator.VolatilityStop(20, 2, closed)
+    last = vstop.update_last(candles['high'][-1], candles['low'][-1], candles['close'][-1])
+    np.testing.assert_allclose(last, indicator.volatility_stop(candles, 20, 2).values[-1])
+    assert vstop.count == len(closed)
+
+
+def test_volatility_stop_from_precomputed_true_range():
+    candles = _forming_candles(100, 120.)
+    closed = candles[:-1]
+    TR = indicator.true_range(closed)
+    VStop = indicator.volatility_stop(closed, 20, 2, ATR=indicator.average_true_range(closed, 20, TR=TR))
+    np.testing.assert_allclose(VStop.values, indicator.volatility_stop(closed, 20, 2).values)
+    vstop = indicator.VolatilityStop(20, 2, closed, TR=TR, VStop=VStop)
+    last = (candles['high'][-1], candles['low'][-1], candles['close'][-1])
+    np.testing.assert_allclose(vstop.update_last(*last),
+                               indicator.VolatilityStop(20, 2, closed).update_last(*last))
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from binance_trading_bot import render
+
+
+def _template_pid():
+    from binance_trading_bot import owl
+    return os.getpid(), owl._chartTemplate is not None
+
+
+@pytest.fixture(params=['initializer', 'barrier'])
+def farm(request, monkeypatch):
+    if request.param=='barrier':
+        # the Python 3.6 path
+        monkeypatch.setattr(render, 'sys', type('sys', (object,), {'version_info': (3, 6, 5)}))
+    farm = render.RenderFarm(2)
+    yield farm
+    farm.shutdown()
+
+
+def test_warm_up_lays_out_every_worker(farm):
+    farm.warm_up()
+    assert len(farm._executor._processes) == 2
+    for future in [farm._executor.submit(_template_pid) for _ in range(4)]:
+        assert future.result()[1]